@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+import asyncio
+import math
+import time
+
+from jsonrpc import JsonRpcClient, JsonRpcError
+from ethtx import Keccak256, Address, SignTransaction, N
+
+
+# every bench transaction sends 1 wei here
+SINK_ADDRESS = "0x000000000000000000000000000000000000dEaD"
+TRANSFER_GAS = 21000
+
+
+# deterministic keys for the accounts premined at genesis for benchmarking
+def BenchKeys(count: int) -> list:
+  return [int.from_bytes(Keccak256(b"psdk-tools-bench-" + str(i).encode("ascii")), "big") % N for i in range(count)]
+
+def Percentile(values: list, percent: float):
+  if not values:
+    return None
+  ordered = sorted(values)
+  # nearest rank
+  return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Bench:
+  # submits signed transfers to all json rpc endpoints and tracks when they land in a block
+  def __init__(self, endpoints: list, keys: list, chain_id: int, total: int, concurrency: int, rate: float, timeout: float) -> None:
+    self.__endpoints = endpoints
+    self.__keys = keys
+    self.__chain_id = chain_id
+    self.__total = total
+    self.__concurrency = max(1, concurrency)
+    self.__rate = rate
+    self.__timeout = timeout
+    self.__submitted = {}
+    self.__confirmed = {}
+    self.__rejections = {}
+    self.__errors = 0
+    # account -> lowest nonce that never reached the pool, nothing above it can be mined
+    self.__gaps = {}
+    self.__senders = {}
+    self.__skipped = 0
+    self.__sent = 0
+    self.__blocks = []
+    self.__last_confirmed_at = None
+    self.__sending = True
+
+  async def Run(self) -> dict:
+    # one keep-alive connection per worker, spread over all endpoints
+    clients = [JsonRpcClient(*self.__endpoints[i % len(self.__endpoints)], timeout=self.__timeout) for i in range(self.__concurrency)]
+    try:
+      transactions = await self.__SignTransactions(clients[0])
+      start_block = int(await clients[0].Call("eth_blockNumber"), 16)
+
+      queue = asyncio.Queue()
+      for transaction in transactions:
+        queue.put_nowait(transaction)
+
+      print(f"Sending {len(transactions)} transactions with {self.__concurrency} workers to {len(self.__endpoints)} endpoints...")
+      started = time.monotonic()
+      watcher = asyncio.ensure_future(self.__WatchBlocks(clients[0], start_block))
+      await asyncio.gather(*[self.__Send(client, queue, started) for client in clients])
+      submit_duration = time.monotonic() - started
+      self.__sending = False
+      await watcher
+      return self.__Report(started, submit_duration)
+    finally:
+      await asyncio.gather(*[client.Close() for client in clients])
+
+  # sign everything up front so signing cost doesn't show up in the measured rate
+  async def __SignTransactions(self, client: JsonRpcClient) -> list:
+    gas_price = int(await client.Call("eth_gasPrice"), 16)
+    nonces = []
+    for key in self.__keys:
+      nonces.append(int(await client.Call("eth_getTransactionCount", [Address(key), "pending"]), 16))
+
+    print(f"Signing {self.__total} transactions from {len(self.__keys)} accounts...")
+    transactions = []
+    for i in range(self.__total):
+      account = i % len(self.__keys)
+      raw, tx_hash = SignTransaction(self.__keys[account], nonces[account], gas_price, TRANSFER_GAS, SINK_ADDRESS, 1, self.__chain_id)
+      transactions.append((raw, tx_hash, account, nonces[account]))
+      nonces[account] += 1
+    return transactions
+
+  async def __Send(self, client: JsonRpcClient, queue: asyncio.Queue, started: float) -> None:
+    while not queue.empty():
+      raw, tx_hash, account, nonce = queue.get_nowait()
+      # behind a gap the transaction would sit in the pool forever
+      if nonce > self.__gaps.get(account, nonce):
+        self.__skipped += 1
+        continue
+      slot = self.__sent
+      self.__sent += 1
+      # pace sends so that the n-th transaction goes out at n / rate
+      if self.__rate:
+        delay = started + slot / self.__rate - time.monotonic()
+        if delay > 0:
+          await asyncio.sleep(delay)
+      try:
+        self.__submitted[tx_hash] = time.monotonic()
+        self.__senders[tx_hash] = (account, nonce)
+        await client.Call("eth_sendRawTransaction", [raw])
+      except JsonRpcError as error:
+        del self.__submitted[tx_hash]
+        self.__rejections[error.message] = self.__rejections.get(error.message, 0) + 1
+        self.__gaps[account] = min(nonce, self.__gaps.get(account, nonce))
+      except (OSError, asyncio.TimeoutError):
+        del self.__submitted[tx_hash]
+        self.__errors += 1
+        self.__gaps[account] = min(nonce, self.__gaps.get(account, nonce))
+
+  # submitted transactions behind a nonce gap, workers send in parallel so some get out before the gap is known
+  def __Stranded(self) -> list:
+    return [tx_hash for tx_hash in self.__submitted if tx_hash not in self.__confirmed and self.__senders[tx_hash][1] > self.__gaps.get(self.__senders[tx_hash][0], self.__senders[tx_hash][1])]
+
+  # poll new blocks until every submitted transaction is included or the timeout passed after sending ended
+  async def __WatchBlocks(self, client: JsonRpcClient, block_number: int) -> None:
+    deadline = None
+    while True:
+      if not self.__sending:
+        deadline = deadline or time.monotonic() + self.__timeout
+        if len(self.__confirmed) + len(self.__Stranded()) >= len(self.__submitted) or time.monotonic() > deadline:
+          return
+      try:
+        head = int(await client.Call("eth_blockNumber"), 16)
+        while block_number < head:
+          block_number += 1
+          block = await client.Call("eth_getBlockByNumber", [hex(block_number), False])
+          now = time.monotonic()
+          hashes = [tx if isinstance(tx, str) else tx["hash"] for tx in (block or {}).get("transactions", [])]
+          self.__blocks.append({"number": block_number, "transactions": len(hashes), "seen_at": now})
+          for tx_hash in hashes:
+            tx_hash = tx_hash.lower()
+            if tx_hash in self.__submitted and tx_hash not in self.__confirmed:
+              self.__confirmed[tx_hash] = now - self.__submitted[tx_hash]
+              self.__last_confirmed_at = now
+      except (OSError, asyncio.TimeoutError, JsonRpcError):
+        pass
+      await asyncio.sleep(0.2)
+
+  def __Report(self, started: float, submit_duration: float) -> dict:
+    latencies = list(self.__confirmed.values())
+    confirm_duration = (self.__last_confirmed_at or started) - started
+    return {
+      "transactions": self.__total,
+      "accounts": len(self.__keys),
+      "endpoints": len(self.__endpoints),
+      "concurrency": self.__concurrency,
+      "target_rate": self.__rate,
+      "submitted": len(self.__submitted),
+      "confirmed": len(self.__confirmed),
+      "rejected": sum(self.__rejections.values()),
+      "rejections": self.__rejections,
+      "errors": self.__errors,
+      # accepted, but behind a rejected or failed nonce of the same account
+      "stranded": len(self.__Stranded()),
+      # never sent because an earlier nonce of the account failed
+      "skipped": self.__skipped,
+      "submit_duration": submit_duration,
+      "submitted_tps": len(self.__submitted) / submit_duration if submit_duration else 0,
+      "confirmed_tps": len(self.__confirmed) / confirm_duration if confirm_duration > 0 else 0,
+      "latency": {
+        "p50": Percentile(latencies, 50),
+        "p95": Percentile(latencies, 95),
+        "p99": Percentile(latencies, 99),
+        "max": max(latencies) if latencies else None,
+      },
+      "blocks": [{"number": block["number"], "transactions": block["transactions"], "at": block["seen_at"] - started} for block in self.__blocks],
+    }
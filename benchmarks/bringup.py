@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+# measures start new chain against the fake go toolchain and node, so the orchestration itself can be compared between changes
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PSDK_TOOLS = os.path.join(os.path.dirname(BENCHMARKS_DIR), "psdk-tools.py")
+FAKE_DIR = os.path.join(BENCHMARKS_DIR, "fake")
+
+sys.path.append(os.path.dirname(BENCHMARKS_DIR))
+from readiness import DEFAULT_MAX_PEERS
+
+
+# a local repo for the git cache to fetch from, the fake go doesn't look at its contents
+def CreateRepo(path: str) -> str:
+  os.makedirs(path)
+  with open(os.path.join(path, "main.go"), "w") as main_file:
+    main_file.write("package main\n\nfunc main() {}\n")
+  env = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@localhost", GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@localhost")
+  for command in (["init", "-q", "-b", "develop"], ["add", "main.go"], ["commit", "-q", "-m", "bench"]):
+    subprocess.run(["git"] + command, cwd=path, env=env, check=True)
+  return "file://" + path
+
+def PsdkTools(command: str, profile: str, options: list, env: dict) -> subprocess.CompletedProcess:
+  return subprocess.run([sys.executable, PSDK_TOOLS, "-c", command, "-P", profile] + options, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+
+# bring a cluster of size nodes up once, returns the timing report
+def BringUp(size: int, run: int, work_dir: str, repo_url: str, args: argparse.Namespace, env: dict) -> dict:
+  profile = f"bench-bringup-{size}"
+  root = os.path.join(work_dir, profile)
+  report_path = os.path.join(work_dir, "reports", f"{profile}-{run}.json")
+  non_validators = size // 4
+  options = [
+    "-u", repo_url, "-gc", os.path.join(work_dir, "git-cache"), "-bd", os.path.join(work_dir, "bin"),
+    "-d", os.path.join(root, "polygon-sdk"), "-pd", os.path.join(root, "data"), "-pl", os.path.join(root, "logs"), "-sp", os.path.join(root, "snapshots"),
+    "-vn", str(size - non_validators), "-n", str(non_validators), "-iw", str(args.init_workers), "-r", args.reuse, "-t", str(args.timeout), "-tr", report_path,
+  ]
+  # fully peered up to the default peer limit, like a real cluster
+  env = dict(env, FAKE_NODE_PEERS=str(min(size-1, DEFAULT_MAX_PEERS)))
+  try:
+    result = PsdkTools("start new chain", profile, options, env)
+    if result.returncode != 0:
+      sys.exit(f"start new chain with {size} nodes failed:\n{result.stdout}{result.stderr}")
+  finally:
+    PsdkTools("destroy", profile, ["-y"], env)
+
+  with open(report_path) as report_file:
+    return json.load(report_file)
+
+# median wall and cpu per phase and per node step over all runs of a size
+def Summarize(reports: list) -> dict:
+  phases = {}
+  for report in reports:
+    for phase in report["otherData"]["phases"]:
+      phases.setdefault(phase["name"], []).append(phase)
+  nodes = {}
+  for report in reports:
+    for node in report["otherData"]["nodes"].values():
+      for category, span in node.items():
+        nodes.setdefault(category, []).append(span["wall"])
+  return {
+    "wall": statistics.median(report["otherData"]["wall"] for report in reports),
+    "phases": {name: {"wall": statistics.median(phase["wall"] for phase in runs), "cpu": statistics.median(phase["cpu"] for phase in runs)} for name, runs in phases.items()},
+    "nodes": {category: {"p50": statistics.median(walls), "max": max(walls)} for category, walls in nodes.items()},
+  }
+
+def PrintSummary(summaries: dict) -> None:
+  sizes = list(summaries)
+  print(f"{'phase':<20}" + "".join(f" {f'{size} nodes wall/cpu':>24}" for size in sizes))
+  names = list(dict.fromkeys(name for summary in summaries.values() for name in summary["phases"]))
+  for name in names:
+    cells = []
+    for size in sizes:
+      phase = summaries[size]["phases"].get(name)
+      cells.append(f"{phase['wall']:.3f}s/{phase['cpu']:.3f}s" if phase else "-")
+    print(f"{name:<20}" + "".join(f" {cell:>24}" for cell in cells))
+  for category in ("init", "start"):
+    cells = [f"{summaries[size]['nodes'][category]['p50']:.3f}s/{summaries[size]['nodes'][category]['max']:.3f}s" if category in summaries[size]["nodes"] else "-" for size in sizes]
+    print(f"{f'node {category} p50/max':<20}" + "".join(f" {cell:>24}" for cell in cells))
+  print(f"{'total':<20}" + "".join(f" {summaries[size]['wall']:>23.3f}s" for size in sizes))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark start new chain against a fake go toolchain and node binary")
+  parser.add_argument("-s", "--sizes",dest="sizes",type=int,default=[4, 16, 64],nargs="*",help="Cluster sizes to bring up. Default: 4 16 64")
+  parser.add_argument("-n", "--runs",dest="runs",type=int,default=3,help="Bring-ups per size, the summary shows the median. Default: 3")
+  parser.add_argument("-iw", "--init-workers",dest="init_workers",type=int,default=os.cpu_count(),help="Passed on to psdk-tools. Default: number of CPUs")
+  parser.add_argument("-r", "--reuse",dest="reuse",choices=["yes","no"],default="no",help="no re-initializes every node on each run, yes measures warm restarts. Default: no")
+  parser.add_argument("-bt", "--block-time",dest="block_time",type=float,default=0.5,help="Seconds between blocks of the fake nodes. Default: 0.5")
+  parser.add_argument("-t", "--timeout",dest="timeout",type=float,default=120,help="Readiness timeout per bring-up. Default: 120")
+  parser.add_argument("-w", "--work-dir",dest="work_dir",default=None,help="Folder for the repo, caches, node data and reports. Default: a new temporary folder")
+  parser.add_argument("-o", "--output",dest="output",default=None,help="File to save the summary and all timing reports to")
+  args = parser.parse_args()
+
+  work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="psdk-bench-bringup-"))
+  env = dict(os.environ, PATH=FAKE_DIR + os.pathsep + os.environ["PATH"], FAKE_NODE_BLOCK_TIME=str(args.block_time))
+  repo_url = CreateRepo(os.path.join(work_dir, f"repo-{time.time_ns()}"))
+
+  reports = {}
+  for size in args.sizes:
+    reports[size] = []
+    for run in range(args.runs):
+      report = BringUp(size, run, work_dir, repo_url, args, env)
+      reports[size].append(report)
+      print(f"{size} nodes, run {run+1}/{args.runs}: {report['otherData']['wall']:.3f}s", flush=True)
+
+  summaries = {size: Summarize(size_reports) for size, size_reports in reports.items()}
+  print()
+  PrintSummary(summaries)
+  print(f"\nTiming reports are in {work_dir}/reports")
+
+  if args.output:
+    with open(args.output, "w") as output_file:
+      json.dump({"summaries": summaries, "reports": reports}, output_file, indent=4)
+    print(f"Results saved to {args.output}")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# stand-in for the polygon-sdk binary: secrets init, and a server that seals blocks and answers the json rpc calls of wait and bench
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import hashlib
+
+# the go stand-in installs a launcher for this file, so the repo modules are found from here
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+from ethtx import Keccak256, Rlp, P, N, G
+
+# seconds between two fake blocks
+BLOCK_TIME = float(os.environ.get("FAKE_NODE_BLOCK_TIME", "0.5"))
+# peers every node reports, real nodes stop at their --max-peers limit
+PEERS = int(os.environ.get("FAKE_NODE_PEERS", "40"))
+
+
+def Option(args: list, name: str) -> str:
+  for i, arg in enumerate(args):
+    if arg == name:
+      return args[i+1]
+    if arg.startswith(name+"="):
+      return arg.split("=", 1)[1]
+  return None
+
+def SecretsInit(args: list) -> None:
+  data_dir = Option(args, "--data-dir")
+  os.makedirs(data_dir+"/consensus", exist_ok=True)
+  digest = hashlib.sha256(os.path.abspath(data_dir).encode("utf-8")).hexdigest()
+  # the real binary logs a bit before the json
+  print("[SECRETS INIT] fake node", flush=True)
+  print(json.dumps({"address": "0x"+digest[:40], "node_id": "16Uiu2HAm"+digest[:44]}), flush=True)
+
+def _RlpDecode(data: bytes, position: int = 0) -> tuple:
+  prefix = data[position]
+  if prefix < 0x80:
+    return data[position:position+1], position + 1
+  if prefix < 0xc0:
+    offset, length = _RlpLength(data, position, prefix - 0x80)
+    return data[offset:offset+length], offset + length
+  offset, length = _RlpLength(data, position, prefix - 0xc0)
+  items, end = [], offset + length
+  while offset < end:
+    item, offset = _RlpDecode(data, offset)
+    items.append(item)
+  return items, end
+
+def _RlpLength(data: bytes, position: int, short: int) -> tuple:
+  if short < 56:
+    return position + 1, short
+  size = short - 55
+  return position + 1 + size, int.from_bytes(data[position+1:position+1+size], "big")
+
+# jacobian coordinates, None is the point at infinity
+def _PointDouble(p: tuple) -> tuple:
+  if p is None or p[1] == 0:
+    return None
+  x, y, z = p
+  yy = y * y % P
+  s = 4 * x * yy % P
+  m = 3 * x * x % P
+  nx = (m * m - 2 * s) % P
+  return nx, (m * (s - nx) - 8 * yy * yy) % P, 2 * y * z % P
+
+def _PointAdd(p: tuple, q: tuple) -> tuple:
+  if p is None:
+    return q
+  if q is None:
+    return p
+  z1z1, z2z2 = p[2] * p[2] % P, q[2] * q[2] % P
+  u1, u2 = p[0] * z2z2 % P, q[0] * z1z1 % P
+  s1, s2 = p[1] * q[2] * z2z2 % P, q[1] * p[2] * z1z1 % P
+  if u1 == u2:
+    return _PointDouble(p) if s1 == s2 else None
+  h, r = (u2 - u1) % P, (s2 - s1) % P
+  hh = h * h % P
+  hhh = h * hh % P
+  v = u1 * hh % P
+  nx = (r * r - hhh - 2 * v) % P
+  return nx, (r * (v - nx) - s1 * hhh) % P, h * p[2] * q[2] % P
+
+# a*A + b*B in one pass (shamir's trick), returns an affine point
+def _LinearCombination(a: int, point_a: tuple, b: int, point_b: tuple) -> tuple:
+  point_a, point_b = point_a + (1,), point_b + (1,)
+  both = _PointAdd(point_a, point_b)
+  result = None
+  for bit in range(max(a.bit_length(), b.bit_length()) - 1, -1, -1):
+    result = _PointDouble(result)
+    pick = ((a >> bit) & 1, (b >> bit) & 1)
+    if pick != (0, 0):
+      result = _PointAdd(result, {(1, 0): point_a, (0, 1): point_b, (1, 1): both}[pick])
+  z = pow(result[2], -1, P)
+  return result[0] * z * z % P, result[1] * z * z * z % P
+
+# sender and nonce of a raw EIP-155 transfer
+def Sender(raw: bytes) -> tuple:
+  fields, _ = _RlpDecode(raw)
+  nonce, v, r, s = (int.from_bytes(field, "big") for field in (fields[0], fields[6], fields[7], fields[8]))
+  chain_id, recovery_id = (v - 35) // 2, (v - 35) % 2
+  digest = int.from_bytes(Keccak256(Rlp(fields[:6] + [chain_id, 0, 0])), "big")
+  y = pow((r * r * r + 7) % P, (P + 1) // 4, P)
+  point = (r, y if y % 2 == recovery_id else P - y)
+  inverse = pow(r, -1, N)
+  public = _LinearCombination(-digest * inverse % N, G, s * inverse % N, point)
+  return "0x" + Keccak256(public[0].to_bytes(32, "big") + public[1].to_bytes(32, "big"))[-20:].hex(), nonce
+
+
+class Chain:
+  # blocks every BLOCK_TIME since genesis.json was written, shared by all nodes through a transaction log next to it.
+  # like a real txpool, a transaction is only mined once every lower nonce of its sender is, later ones stay queued
+  def __init__(self, genesis_path: str, max_slots: int) -> None:
+    genesis = os.stat(genesis_path)
+    self.__genesis_time = genesis.st_mtime
+    self.__max_slots = max_slots
+    # a new genesis.json is a new chain
+    self.__log_path = f"{genesis_path}.{genesis.st_mtime_ns}.fake-txs"
+    self.__offset = 0
+    # sender -> nonce -> (hash, block it was sent in)
+    self.__accounts = {}
+    # block -> mined transactions, rebuilt when the log grows
+    self.__blocks = {}
+    # hashes this node accepted, they hold a slot until mined
+    self.__own = set()
+
+  def Height(self) -> int:
+    return max(0, int((time.time() - self.__genesis_time) / BLOCK_TIME))
+
+  # next nonce of the sender, counting transactions waiting in the pool
+  def Nonce(self, address: str) -> int:
+    self.__Refresh()
+    nonces = self.__accounts.get(address.lower(), {})
+    nonce = 0
+    while nonce in nonces:
+      nonce += 1
+    return nonce
+
+  def Send(self, raw: str) -> str:
+    self.__Refresh()
+    data = bytes.fromhex(raw[2:])
+    tx_hash = "0x" + Keccak256(data).hex()
+    sender, nonce = Sender(data)
+    if nonce in self.__accounts.get(sender, {}):
+      raise ValueError("already known" if self.__accounts[sender][nonce][0] == tx_hash else "nonce too low")
+    height = self.Height()
+    mined = {tx for block, transactions in self.__blocks.items() if block <= height for tx in transactions}
+    self.__own -= mined
+    if len(self.__own) >= self.__max_slots:
+      raise ValueError("txpool is full")
+    # appends this small are atomic, so all nodes can share the log
+    with open(self.__log_path, "a") as log_file:
+      log_file.write(f"{sender} {nonce} {tx_hash} {height+1}\n")
+    self.__own.add(tx_hash)
+    return tx_hash
+
+  def Block(self, number: int) -> dict:
+    if number > self.Height():
+      return None
+    self.__Refresh()
+    block_hash = "0x" + Keccak256(b"fake-block-%d" % number).hex()
+    return {"number": hex(number), "hash": block_hash, "transactions": self.__blocks.get(number, [])}
+
+  def __Refresh(self) -> None:
+    if not os.path.isfile(self.__log_path):
+      return
+    with open(self.__log_path) as log_file:
+      log_file.seek(self.__offset)
+      lines = log_file.read().split("\n")
+      # keep a line still being written for next time
+      rest = lines.pop()
+      self.__offset = log_file.tell() - len(rest.encode("utf-8"))
+    if not lines:
+      return
+    for line in lines:
+      sender, nonce, tx_hash, block = line.split()
+      self.__accounts.setdefault(sender, {}).setdefault(int(nonce), (tx_hash, int(block)))
+
+    # a transaction lands in the block it was sent for, or with the one before it if that came later
+    self.__blocks = {}
+    for nonces in self.__accounts.values():
+      nonce, block = 0, 0
+      while nonce in nonces:
+        tx_hash, sent_block = nonces[nonce]
+        block = max(block, sent_block)
+        self.__blocks.setdefault(block, []).append(tx_hash)
+        nonce += 1
+
+
+async def Server(args: list) -> None:
+  chain = Chain(Option(args, "--chain"), int(Option(args, "--max-slots") or 4096))
+
+  async def Discard(reader, writer) -> None:
+    writer.close()
+
+  def Call(method: str, params: list):
+    if method == "eth_blockNumber":
+      return hex(chain.Height())
+    if method == "net_peerCount":
+      return hex(PEERS)
+    if method == "eth_gasPrice":
+      return hex(1)
+    if method == "eth_getTransactionCount":
+      return hex(chain.Nonce(params[0]))
+    if method == "eth_sendRawTransaction":
+      return chain.Send(params[0])
+    if method == "eth_getBlockByNumber":
+      return chain.Block(int(params[0], 16))
+    raise LookupError(f"the method {method} does not exist")
+
+  # json rpc over keep-alive HTTP/1.1, just the methods psdk-tools calls
+  async def JsonRpc(reader, writer) -> None:
+    try:
+      while True:
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = next(int(line.split(b":", 1)[1]) for line in headers.split(b"\r\n") if line.lower().startswith(b"content-length:"))
+        request = json.loads(await reader.readexactly(length))
+        response = {"jsonrpc": "2.0", "id": request["id"]}
+        try:
+          response["result"] = Call(request["method"], request.get("params") or [])
+        except LookupError as error:
+          response["error"] = {"code": -32601, "message": str(error)}
+        except ValueError as error:
+          response["error"] = {"code": -32000, "message": str(error)}
+        body = json.dumps(response).encode("utf-8")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+        await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, StopIteration, ValueError):
+      writer.close()
+
+  servers = []
+  for flag, handler in (("--grpc", Discard), ("--libp2p", Discard), ("--jsonrpc", JsonRpc)):
+    host, port = Option(args, flag).rsplit(":", 1)
+    servers.append(await asyncio.start_server(handler, host, int(port), reuse_address=True))
+
+  height = chain.Height()
+  while True:
+    while height < chain.Height():
+      height += 1
+      print(f"{time.strftime('%Y-%m-%dT%H:%M:%S')}.000Z [INFO]  polygon.blockchain: write block: num={height} txns=0", flush=True)
+    await asyncio.sleep(BLOCK_TIME)
+
+if __name__ == "__main__":
+  args = sys.argv[1:]
+  if args[:2] == ["secrets", "init"]:
+    SecretsInit(args)
+  elif args[:1] == ["server"]:
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    asyncio.run(Server(args))
+  else:
+    sys.exit(f"fake node: unsupported command {' '.join(args)}")
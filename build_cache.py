@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+import os
+import sys
+import shutil
+import subprocess
+import time
+# import local git package
+sys.path.append(os.path.dirname(__file__)+'/vendor/git')
+from git import Repo
+from helpers import FileLock
+
+
+# name of the compiled polygon-sdk binary inside every cache entry
+BINARY_NAME = "polygon-sdk"
+
+
+class BuildCache:
+  # cache of compiled polygon-sdk binaries, one directory per commit sha
+  def __init__(self, cache_dir: str, max_size_mb: int = 2048, max_age_days: int = 14) -> None:
+    self.__cache_dir = cache_dir
+    self.__max_size = int(max_size_mb) * 1024 * 1024
+    self.__max_age = int(max_age_days) * 24 * 60 * 60
+
+  # return the path of the binary for the tree in clone_path, building it only if the commit is not cached yet
+  def Binary(self, clone_path: str) -> str:
+    key = self.__CacheKey(clone_path)
+    entry = os.path.join(self.__cache_dir, key)
+    binary = os.path.join(entry, BINARY_NAME)
+
+    # profiles share the cache, so only one of them builds a commit and nobody evicts it meanwhile
+    with FileLock(f"{entry}.lock"):
+      # dirty trees are always rebuilt, their sha does not describe the sources
+      if os.path.isfile(binary) and not key.endswith("-dirty"):
+        print(f"Using cached polygon-sdk binary for commit {key[:12]}.")
+      else:
+        self.__Build(clone_path, entry)
+      # mark the entry as recently used
+      os.utime(entry)
+
+    self.__Evict(keep=key)
+    return binary
+
+  # cache key is the checked out commit sha
+  def __CacheKey(self, clone_path: str) -> str:
+    repo = Repo(clone_path)
+    key = repo.head.commit.hexsha
+    if repo.is_dirty(untracked_files=False):
+      key += "-dirty"
+    return key
+
+  # compile the tree into a temp dir and move it into place when done
+  def __Build(self, clone_path: str, entry: str) -> None:
+    print(f"Building polygon-sdk binary from {clone_path}...")
+    os.makedirs(self.__cache_dir, exist_ok=True)
+    build_dir = f"{entry}.tmp-{os.getpid()}"
+    if os.path.isdir(build_dir):
+      shutil.rmtree(build_dir)
+    os.mkdir(build_dir)
+
+    result = subprocess.run(["go", "build", "-o", os.path.join(build_dir, BINARY_NAME), "."], cwd=clone_path, capture_output=True)
+    if result.returncode != 0:
+      shutil.rmtree(build_dir)
+      print(result.stdout.decode("utf-8"), result.stderr.decode("utf-8"))
+      sys.exit(f"Failed to build polygon-sdk from {clone_path}!")
+
+    if os.path.isdir(entry):
+      shutil.rmtree(entry)
+    os.replace(build_dir, entry)
+    print(f"Binary cached at {entry}")
+
+  # remove entries older than max age, then least recently used ones until we fit in max size
+  def __Evict(self, keep: str) -> None:
+    entries = []
+    now = time.time()
+    for name in os.listdir(self.__cache_dir):
+      path = os.path.join(self.__cache_dir, name)
+      if name == keep or ".tmp-" in name or not os.path.isdir(path):
+        continue
+      mtime = os.path.getmtime(path)
+      if self.__max_age and now - mtime > self.__max_age:
+        self.__Remove(path)
+        continue
+      entries.append((mtime, self.__DirSize(path), path))
+
+    total = self.__DirSize(os.path.join(self.__cache_dir, keep)) + sum(size for _, size, _ in entries)
+    # oldest first
+    for _, size, path in sorted(entries):
+      if not self.__max_size or total <= self.__max_size:
+        break
+      if self.__Remove(path):
+        total -= size
+
+  # remove an entry unless another run is building or using it right now
+  def __Remove(self, path: str) -> bool:
+    try:
+      with FileLock(f"{path}.lock", blocking=False):
+        shutil.rmtree(path, ignore_errors=True)
+        return True
+    except BlockingIOError:
+      return False
+
+  def __DirSize(self, path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+      for file_name in files:
+        size += os.path.getsize(os.path.join(root, file_name))
+    return size
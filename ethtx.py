@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+# dependency free signing of legacy (EIP-155) ethereum transactions: keccak256, secp256k1 and rlp
+import hashlib
+import hmac
+
+
+# keccak-f[1600] round constants and rotation offsets
+ROUND_CONSTANTS = [
+  0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+  0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+  0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+  0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+  0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+  0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+ROTATIONS = [
+  [0, 36, 3, 41, 18], [1, 44, 10, 45, 2], [62, 6, 43, 15, 61], [28, 55, 25, 21, 56], [27, 20, 39, 8, 14],
+]
+MASK = (1 << 64) - 1
+
+# secp256k1 curve parameters
+P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+G = (0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798, 0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
+
+
+def _Rotate(value: int, shift: int) -> int:
+  return ((value << shift) | (value >> (64 - shift))) & MASK if shift else value
+
+def _KeccakF(lanes: list) -> None:
+  for constant in ROUND_CONSTANTS:
+    # theta
+    columns = [lanes[x][0] ^ lanes[x][1] ^ lanes[x][2] ^ lanes[x][3] ^ lanes[x][4] for x in range(5)]
+    for x in range(5):
+      d = columns[(x - 1) % 5] ^ _Rotate(columns[(x + 1) % 5], 1)
+      for y in range(5):
+        lanes[x][y] ^= d
+    # rho and pi
+    b = [[0] * 5 for _ in range(5)]
+    for x in range(5):
+      for y in range(5):
+        b[y][(2 * x + 3 * y) % 5] = _Rotate(lanes[x][y], ROTATIONS[x][y])
+    # chi
+    for x in range(5):
+      for y in range(5):
+        lanes[x][y] = b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y])
+    # iota
+    lanes[0][0] ^= constant
+
+def Keccak256(data: bytes) -> bytes:
+  rate = 136
+  # original keccak padding, not the sha3 one from hashlib
+  padded = bytearray(data) + b"\x01" + b"\x00" * ((rate - len(data) - 1) % rate)
+  padded[-1] |= 0x80
+  lanes = [[0] * 5 for _ in range(5)]
+  for offset in range(0, len(padded), rate):
+    block = padded[offset:offset + rate]
+    for i in range(rate // 8):
+      lanes[i % 5][i // 5] ^= int.from_bytes(block[i * 8:i * 8 + 8], "little")
+    _KeccakF(lanes)
+  return b"".join(lanes[i % 5][i // 5].to_bytes(8, "little") for i in range(4))
+
+
+# jacobian point arithmetic, points are (x, y, z) with z == 0 meaning infinity
+def _Double(point: tuple) -> tuple:
+  x, y, z = point
+  if not y:
+    return (0, 0, 0)
+  ysq = y * y % P
+  s = 4 * x * ysq % P
+  m = 3 * x * x % P
+  nx = (m * m - 2 * s) % P
+  ny = (m * (s - nx) - 8 * ysq * ysq) % P
+  return (nx, ny, 2 * y * z % P)
+
+def _Add(p: tuple, q: tuple) -> tuple:
+  if not p[2]:
+    return q
+  if not q[2]:
+    return p
+  z1z1 = p[2] * p[2] % P
+  z2z2 = q[2] * q[2] % P
+  u1 = p[0] * z2z2 % P
+  u2 = q[0] * z1z1 % P
+  s1 = p[1] * z2z2 * q[2] % P
+  s2 = q[1] * z1z1 * p[2] % P
+  if u1 == u2:
+    return _Double(p) if s1 == s2 else (0, 0, 0)
+  h = u2 - u1
+  r = s2 - s1
+  hh = h * h % P
+  hhh = h * hh % P
+  v = u1 * hh % P
+  nx = (r * r - hhh - 2 * v) % P
+  ny = (r * (v - nx) - s1 * hhh) % P
+  return (nx, ny, h * p[2] * q[2] % P)
+
+def _Multiply(scalar: int) -> tuple:
+  result = (0, 0, 0)
+  addend = (G[0], G[1], 1)
+  while scalar:
+    if scalar & 1:
+      result = _Add(result, addend)
+    addend = _Double(addend)
+    scalar >>= 1
+  z = pow(result[2], -1, P)
+  return (result[0] * z * z % P, result[1] * z * z * z % P)
+
+# deterministic nonce from RFC 6979
+def _Nonce(key: int, digest: bytes) -> int:
+  key_bytes = key.to_bytes(32, "big")
+  v = b"\x01" * 32
+  k = b"\x00" * 32
+  k = hmac.new(k, v + b"\x00" + key_bytes + digest, hashlib.sha256).digest()
+  v = hmac.new(k, v, hashlib.sha256).digest()
+  k = hmac.new(k, v + b"\x01" + key_bytes + digest, hashlib.sha256).digest()
+  v = hmac.new(k, v, hashlib.sha256).digest()
+  while True:
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    nonce = int.from_bytes(v, "big")
+    if 0 < nonce < N:
+      return nonce
+    k = hmac.new(k, v + b"\x00", hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+
+# sign a 32 byte digest, returns (r, s, recovery id) with low s
+def Sign(key: int, digest: bytes) -> tuple:
+  nonce = _Nonce(key, digest)
+  x, y = _Multiply(nonce)
+  r = x % N
+  s = pow(nonce, -1, N) * (int.from_bytes(digest, "big") + r * key) % N
+  recovery_id = y & 1
+  if s > N // 2:
+    s = N - s
+    recovery_id ^= 1
+  return r, s, recovery_id
+
+def Address(key: int) -> str:
+  x, y = _Multiply(key)
+  return "0x" + Keccak256(x.to_bytes(32, "big") + y.to_bytes(32, "big"))[-20:].hex()
+
+
+def _RlpLength(length: int, offset: int) -> bytes:
+  if length < 56:
+    return bytes([offset + length])
+  encoded = length.to_bytes((length.bit_length() + 7) // 8, "big")
+  return bytes([offset + 55 + len(encoded)]) + encoded
+
+def Rlp(item) -> bytes:
+  if isinstance(item, list):
+    payload = b"".join(Rlp(element) for element in item)
+    return _RlpLength(len(payload), 0xc0) + payload
+  if isinstance(item, int):
+    item = item.to_bytes((item.bit_length() + 7) // 8, "big")
+  if len(item) == 1 and item[0] < 0x80:
+    return item
+  return _RlpLength(len(item), 0x80) + item
+
+# sign a plain transfer, returns the raw transaction and its hash
+def SignTransaction(key: int, nonce: int, gas_price: int, gas: int, to: str, value: int, chain_id: int, data: bytes = b"") -> tuple:
+  fields = [nonce, gas_price, gas, bytes.fromhex(to[2:]), value, data]
+  r, s, recovery_id = Sign(key, Keccak256(Rlp(fields + [chain_id, 0, 0])))
+  raw = Rlp(fields + [chain_id * 2 + 35 + recovery_id, r, s])
+  return "0x" + raw.hex(), "0x" + Keccak256(raw).hex()
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+import os
+import re
+import csv
+import json
+import hashlib
+import tempfile
+
+from ethtx import Rlp
+
+
+# defaults of the polygon-sdk genesis command
+DEFAULT_CHAIN_ID = 100
+DEFAULT_GAS_LIMIT = 5242880
+GENESIS_GAS_USED = 458752
+IBFT_EXTRA_VANITY = 32
+ALL_FORKS = ["homestead", "byzantium", "constantinople", "petersburg", "istanbul", "EIP150", "EIP158", "EIP155"]
+ZERO_HASH = "0x" + "00" * 32
+ZERO_ADDRESS = "0x" + "00" * 20
+
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+
+def ParseBalance(value) -> int:
+  value = str(value).strip()
+  return int(value, 16) if value.lower().startswith("0x") else int(value)
+
+# yield (address, balance) from the cli addresses and premine files one at a time, files are never loaded whole
+def PremineAccounts(addresses: list, funds, files: list):
+  for address in addresses:
+    yield address, ParseBalance(funds)
+
+  for path in files:
+    with open(path, newline="") as premine_file:
+      if path.endswith((".jsonl", ".ndjson")):
+        rows = ((line_number, json.loads(line)) for line_number, line in enumerate(premine_file, 1) if line.strip())
+        rows = ((line_number, (row["address"], row.get("balance", funds))) for line_number, row in rows)
+      else:
+        rows = ((line_number, (row[0], row[1] if len(row) > 1 and row[1].strip() else funds)) for line_number, row in enumerate(csv.reader(premine_file), 1) if row)
+
+      for line_number, (address, balance) in rows:
+        address = address.strip()
+        # allow a header line
+        if line_number == 1 and not address.lower().startswith("0x"):
+          continue
+        if not ADDRESS_PATTERN.match(address):
+          raise ValueError(f"{path}:{line_number}: invalid address {address}")
+        yield address, ParseBalance(balance)
+
+# vanity bytes followed by the rlp encoded istanbul extra with the validator set
+def IbftExtraData(validators: list) -> str:
+  extra = Rlp([[bytes.fromhex(address[2:]) for address in validators], b"", []])
+  return "0x" + "00" * IBFT_EXTRA_VANITY + extra.hex()
+
+# hash of everything the genesis file is built from, premine files are hashed in chunks
+def GenesisInputsHash(params: dict, files: list) -> str:
+  digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8"))
+  for path in files:
+    digest.update(path.encode("utf-8"))
+    with open(path, "rb") as premine_file:
+      for chunk in iter(lambda: premine_file.read(1024 * 1024), b""):
+        digest.update(chunk)
+  return digest.hexdigest()
+
+# write genesis.json straight to disk, the premine alloc is streamed so memory stays flat for any number of accounts
+def WriteGenesis(path: str, validators: list, bootnodes: list, premine, chain_id: int = DEFAULT_CHAIN_ID, gas_limit: int = DEFAULT_GAS_LIMIT, name: str = "example") -> int:
+  genesis = {
+    "nonce": "0x0000000000000000",
+    "timestamp": "0x0",
+    "extraData": IbftExtraData(validators),
+    "gasLimit": hex(gas_limit),
+    "difficulty": "0x1",
+    "mixHash": ZERO_HASH,
+    "coinbase": ZERO_ADDRESS,
+  }
+  footer = {
+    "number": "0x0",
+    "gasUsed": hex(GENESIS_GAS_USED),
+    "parentHash": ZERO_HASH,
+  }
+  params = {
+    "forks": {fork: 0 for fork in ALL_FORKS},
+    "chainID": chain_id,
+    "engine": {"ibft": {}},
+    "blockGasTarget": 0,
+  }
+
+  accounts = 0
+  fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix="genesis.json.")
+  try:
+    with os.fdopen(fd, "w") as genesis_file:
+      genesis_file.write(f'{{\n    "name": {json.dumps(name)},\n    "genesis": {{\n')
+      for key, value in genesis.items():
+        genesis_file.write(f'        {json.dumps(key)}: {json.dumps(value)},\n')
+      genesis_file.write('        "alloc": {')
+      for address, balance in premine:
+        genesis_file.write(f'{"," if accounts else ""}\n            {json.dumps(address)}: {{"balance": "{hex(balance)}"}}')
+        accounts += 1
+      genesis_file.write('\n        },\n')
+      genesis_file.write(",\n".join(f'        {json.dumps(key)}: {json.dumps(value)}' for key, value in footer.items()))
+      genesis_file.write('\n    },\n    "params": ')
+      genesis_file.write(json.dumps(params, indent=4).replace("\n", "\n    "))
+      genesis_file.write(',\n    "bootnodes": ')
+      genesis_file.write(json.dumps(bootnodes, indent=4).replace("\n", "\n    "))
+      genesis_file.write('\n}\n')
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.remove(tmp_path)
+    raise
+  return accounts
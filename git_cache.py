@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+import os
+import re
+import sys
+import hashlib
+# import local git package
+sys.path.append(os.path.dirname(__file__)+'/vendor/git')
+from git import Repo
+from git.exc import GitCommandError
+from helpers import FileLock
+
+# fetch failures that mean we couldn't talk to the remote, as opposed to the remote answering no
+TRANSPORT_ERROR_PATTERN = re.compile(r"unable to access|could not resolve|could not read from remote|failed to connect|connection (?:refused|reset|timed out)|network is unreachable|timed out|early eof|remote end hung up", re.IGNORECASE)
+
+class GitCache:
+  # bare mirror of the polygon-sdk repo with one cached worktree per branch or commit
+  def __init__(self, cache_dir: str, url: str, depth: int = 1) -> None:
+    self.__cache_dir = cache_dir
+    self.__url = url
+    self.__depth = int(depth)
+
+  # fetch ref into the mirror and return the path of its up to date worktree
+  def Checkout(self, ref: str) -> str:
+    # profiles share the cache, git itself fails on concurrent fetches and worktree changes
+    with FileLock(os.path.join(self.__cache_dir, "mirror.lock")):
+      return self.__Checkout(ref)
+
+  def __Checkout(self, ref: str) -> str:
+    mirror = self.__Mirror()
+    # readable, and a hash so feature/x and feature_x don't share a worktree
+    key = re.sub(r"[^A-Za-z0-9._-]", "_", ref) + "-" + hashlib.sha1(ref.encode("utf-8")).hexdigest()[:8]
+    worktree = os.path.join(self.__cache_dir, "worktrees", key)
+    local_ref = f"refs/remotes/origin/{key}"
+
+    try:
+      self.__Fetch(mirror, ref, local_ref)
+    except GitCommandError as error:
+      # work offline with the last fetched state if we have seen this ref before.
+      # a ref the remote doesn't have is an error even then
+      if not os.path.isdir(worktree) or not TRANSPORT_ERROR_PATTERN.search(str(error.stderr)):
+        raise
+      print(f"Fetching {ref} failed, using the cached worktree: {error.stderr.strip()}")
+      return worktree
+
+    sha = mirror.git.rev_parse(local_ref)
+    if os.path.isdir(worktree):
+      tree = Repo(worktree)
+      if tree.head.commit.hexsha != sha or tree.is_dirty(untracked_files=False):
+        tree.git.reset("--hard", sha)
+    else:
+      # drop worktrees whose dirs were deleted by hand
+      mirror.git.worktree("prune")
+      mirror.git.worktree("add", "--force", "--detach", worktree, sha)
+
+    print(f"{ref} is at commit {sha[:12]}.")
+    return worktree
+
+  # open the bare mirror, creating it on first use
+  def __Mirror(self) -> Repo:
+    path = os.path.join(self.__cache_dir, "mirror.git")
+    if os.path.isdir(path):
+      mirror = Repo(path)
+    else:
+      os.makedirs(self.__cache_dir, exist_ok=True)
+      mirror = Repo.init(path, bare=True)
+
+    if "origin" not in [remote.name for remote in mirror.remotes]:
+      mirror.create_remote("origin", self.__url)
+    elif mirror.remotes.origin.url != self.__url:
+      mirror.remotes.origin.set_url(self.__url)
+    return mirror
+
+  # fetch only the missing objects of ref, shallow unless depth is 0
+  def __Fetch(self, mirror: Repo, ref: str, local_ref: str) -> None:
+    print(f"Fetching {ref} from {self.__url}...")
+    args = ["--no-tags"]
+    if self.__depth > 0:
+      args += ["--depth", str(self.__depth)]
+    mirror.git.fetch(*args, "origin", f"+{ref}:{local_ref}")
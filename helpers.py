@@ -1,4 +1,18 @@
-def UserInputBool(message: str) -> bool:
+import os
+import json
+import fcntl
+import tempfile
+
+
+def UserInputBool(message: str, policy: str = "ask") -> bool:
+  # non interactive runs answer every prompt from the reuse policy
+  if policy == "yes":
+    print(message + "y")
+    return True
+  if policy == "no":
+    print(message + "N")
+    return False
+
   accepted_responces = ["n","N","y","Y"]
   user_responce = ""
 
@@ -9,3 +23,80 @@ def UserInputBool(message: str) -> bool:
     return False
   else:
     return True
+
+class FileLock:
+  # exclusive flock on path, held while the with block runs. blocking=False raises BlockingIOError if it is taken
+  def __init__(self, path: str, blocking: bool = True) -> None:
+    self.__path = path
+    self.__blocking = blocking
+    self.__file = None
+
+  def __enter__(self):
+    os.makedirs(os.path.dirname(os.path.abspath(self.__path)), exist_ok=True)
+    # the file is never removed, a waiter could otherwise end up locking a deleted file
+    self.__file = open(self.__path, "a")
+    try:
+      fcntl.flock(self.__file, fcntl.LOCK_EX if self.__blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BaseException:
+      self.__file.close()
+      raise
+    return self
+
+  def __exit__(self, *_) -> None:
+    fcntl.flock(self.__file, fcntl.LOCK_UN)
+    self.__file.close()
+
+# write json to a temp file next to the target and rename it, so readers never see a partial file
+def WriteJsonAtomic(path: str, data, indent: int = 4, sort_keys: bool = False) -> None:
+  fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path)+".")
+  try:
+    with os.fdopen(fd, "w") as json_file:
+      json.dump(data, json_file, indent=indent, sort_keys=sort_keys)
+      json_file.flush()
+      os.fsync(json_file.fileno())
+    # mkstemp creates the file as 0600, keep the permissions a plain open() would give
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.remove(tmp_path)
+    raise
+
+# decode the first json object from a binary stream as soon as it is complete, ignoring any leading log noise
+def ReadJsonObject(stream, chunk_size: int = 4096):
+  decoder = json.JSONDecoder()
+  buffer = ""
+  # the outermost brace we are decoding from, nested braces are never tried on their own
+  start = -1
+  while True:
+    chunk = stream.read1(chunk_size) if hasattr(stream, "read1") else stream.read(chunk_size)
+    if not chunk:
+      return None
+    buffer += chunk.decode("utf-8", errors="replace")
+    if start == -1:
+      start = buffer.find("{")
+      if start == -1:
+        buffer = ""
+        continue
+      # drop noise before the first brace
+      buffer = buffer[start:]
+      start = 0
+
+    while start != -1:
+      try:
+        obj, _ = decoder.raw_decode(buffer, start)
+        return obj
+      except json.JSONDecodeError as error:
+        if _Truncated(buffer, error):
+          # wait for the rest of this object
+          break
+        # the brace was noise, move on to the next one
+        start = buffer.find("{", start+1)
+    if start == -1:
+      buffer = ""
+
+# True if the decode error only means the data ends too early
+def _Truncated(buffer: str, error: json.JSONDecodeError) -> bool:
+  if error.pos >= len(buffer) or error.msg.startswith("Unterminated string"):
+    return True
+  rest = buffer[error.pos:]
+  return any(literal.startswith(rest) for literal in ("true", "false", "null"))
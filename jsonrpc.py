@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+import asyncio
+import json
+import socket
+import struct
+
+
+class JsonRpcError(Exception):
+  # error object returned by the node
+  def __init__(self, code: int, message: str) -> None:
+    super().__init__(f"{message} (code {code})")
+    self.code = code
+    self.message = message
+
+
+class JsonRpcClient:
+  # minimal asyncio JSON-RPC over HTTP/1.1 client that keeps its connection alive between calls
+  def __init__(self, host: str, port: int, timeout: float = 5) -> None:
+    self.host = host
+    self.port = int(port)
+    self.__timeout = timeout
+    self.__reader = None
+    self.__writer = None
+    self.__lock = asyncio.Lock()
+    self.__request_id = 0
+
+  # call method and return its result, raises JsonRpcError for error responses
+  async def Call(self, method: str, params: list = None):
+    async with self.__lock:
+      self.__request_id += 1
+      body = json.dumps({"jsonrpc": "2.0", "id": self.__request_id, "method": method, "params": params or []}).encode("utf-8")
+      request = (f"POST / HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n").encode("ascii") + body
+
+      # a reused connection may have been closed by the server while idle, retry those once on a fresh one
+      reused = self.__writer is not None
+      try:
+        response = await asyncio.wait_for(self.__RoundTrip(request), self.__timeout)
+      except (ConnectionError, asyncio.IncompleteReadError) as error:
+        await self.__Disconnect()
+        if not reused or getattr(error, "partial", b""):
+          raise
+        response = await asyncio.wait_for(self.__RoundTrip(request), self.__timeout)
+      except BaseException:
+        await self.__Disconnect()
+        raise
+
+    if response.get("error"):
+      raise JsonRpcError(response["error"].get("code", 0), response["error"].get("message", ""))
+    return response.get("result")
+
+  # reset skips TIME_WAIT, so the ephemeral port is free again right away
+  async def Close(self, reset: bool = False) -> None:
+    async with self.__lock:
+      await self.__Disconnect(reset)
+
+  async def __RoundTrip(self, request: bytes) -> dict:
+    if self.__writer is None:
+      self.__reader, self.__writer = await asyncio.open_connection(self.host, self.port)
+    self.__writer.write(request)
+    await self.__writer.drain()
+
+    status, headers, body = await ReadResponse(self.__reader)
+    if headers.get("connection", "").lower() == "close":
+      await self.__Disconnect()
+    if status != 200:
+      raise JsonRpcError(status, f"HTTP {status}: {body.decode('utf-8', errors='replace').strip()}")
+    return json.loads(body)
+
+  async def __Disconnect(self, reset: bool = False) -> None:
+    if self.__writer is not None:
+      if reset:
+        self.__writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+      self.__writer.close()
+      try:
+        await self.__writer.wait_closed()
+      except (ConnectionError, OSError):
+        pass
+    self.__reader = None
+    self.__writer = None
+
+
+# read one HTTP/1.1 response, returns the status code, lower cased headers and the body
+async def ReadResponse(reader: asyncio.StreamReader) -> tuple:
+  status_line = await reader.readuntil(b"\r\n")
+  status = int(status_line.split()[1])
+  headers = {}
+  while True:
+    line = await reader.readuntil(b"\r\n")
+    if line == b"\r\n":
+      break
+    name, _, value = line.decode("latin-1").partition(":")
+    headers[name.strip().lower()] = value.strip()
+
+  if headers.get("transfer-encoding", "").lower() == "chunked":
+    body = b""
+    while True:
+      size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+      chunk = await reader.readexactly(size + 2)
+      if size == 0:
+        break
+      body += chunk[:-2]
+  elif "content-length" in headers:
+    body = await reader.readexactly(int(headers["content-length"]))
+  else:
+    body = await reader.read()
+    headers["connection"] = "close"
+  return status, headers, body
@@ -0,0 +1,285 @@
+#!/usr/bin/python3
+import os
+import re
+import gzip
+import time
+import shutil
+import selectors
+import concurrent.futures
+
+from helpers import WriteJsonAtomic
+
+
+# longest partial line we keep around while waiting for its newline
+MAX_LINE = 64 * 1024
+
+# polygon-sdk debug log lines we turn into per node counters
+HEIGHT_PATTERN = re.compile(r"(?:write block: num|block committed: sequence|new block: number)=(\d+)")
+INCLUDED_TXS_PATTERN = re.compile(r"(?:block committed|new block|write block):.*?\btx(?:n)?s=(\d+)")
+ROUND_CHANGE_PATTERN = re.compile(r"RoundChangeState|round change", re.IGNORECASE)
+PEER_CONNECTED_PATTERN = re.compile(r"peer connected", re.IGNORECASE)
+PEER_DISCONNECTED_PATTERN = re.compile(r"peer disconnected", re.IGNORECASE)
+PEERS_PATTERN = re.compile(r"\bpeers=(\d+)")
+TXPOOL_ADD_PATTERN = re.compile(r"txpool.*add tx", re.IGNORECASE)
+TXPOOL_SIZE_PATTERN = re.compile(r"txpool.*\b(?:pending|slots|size)=(\d+)", re.IGNORECASE)
+
+
+class NodeMetrics:
+  # counters parsed line by line from a single node's log
+  def __init__(self, index: int) -> None:
+    self.index = index
+    self.height = 0
+    self.round_changes = 0
+    self.peers = 0
+    self.txpool_size = 0
+    self.lines = 0
+    self.last_line_at = None
+
+  def Parse(self, line: str) -> None:
+    self.lines += 1
+    self.last_line_at = time.time()
+
+    match = HEIGHT_PATTERN.search(line)
+    if match:
+      self.height = max(self.height, int(match.group(1)))
+      included = INCLUDED_TXS_PATTERN.search(line)
+      if included:
+        self.txpool_size = max(0, self.txpool_size - int(included.group(1)))
+      return
+
+    if ROUND_CHANGE_PATTERN.search(line):
+      self.round_changes += 1
+    elif PEERS_PATTERN.search(line):
+      self.peers = int(PEERS_PATTERN.search(line).group(1))
+    elif PEER_CONNECTED_PATTERN.search(line):
+      self.peers += 1
+    elif PEER_DISCONNECTED_PATTERN.search(line):
+      self.peers = max(0, self.peers - 1)
+    elif TXPOOL_SIZE_PATTERN.search(line):
+      self.txpool_size = int(TXPOOL_SIZE_PATTERN.search(line).group(1))
+    elif TXPOOL_ADD_PATTERN.search(line):
+      self.txpool_size += 1
+
+  def ToDict(self) -> dict:
+    return {
+      "height": self.height,
+      "round_changes": self.round_changes,
+      "peers": self.peers,
+      "txpool_size": self.txpool_size,
+      "lines": self.lines,
+      "last_line_at": self.last_line_at,
+    }
+
+
+class RotatingLog:
+  # append only log file, rotated into gzipped backups once it grows past max_bytes
+  def __init__(self, path: str, max_bytes: int, backups: int, compressor: concurrent.futures.Executor) -> None:
+    self.path = path
+    self.__max_bytes = max_bytes
+    self.__backups = backups
+    self.__compressor = compressor
+    self.__file = open(path, "ab")
+    self.__size = self.__file.tell()
+
+  def Write(self, data: bytes) -> None:
+    self.__file.write(data)
+    self.__size += len(data)
+    if self.__max_bytes and self.__size >= self.__max_bytes:
+      self.__Rotate()
+
+  def Flush(self) -> None:
+    self.__file.flush()
+
+  def Close(self) -> None:
+    self.__file.close()
+
+  # move the full file aside right away and compress it in the background so the pipes keep draining
+  def __Rotate(self) -> None:
+    self.__file.close()
+    pending = f"{self.path}.{time.time_ns()}.rotating"
+    os.replace(self.path, pending)
+    self.__compressor.submit(self.__Compress, pending)
+    self.__file = open(self.path, "ab")
+    self.__size = 0
+
+  def __Compress(self, pending: str) -> None:
+    # shift node-N.log.1.gz -> node-N.log.2.gz ..., the oldest one falls off
+    for i in range(self.__backups - 1, 0, -1):
+      if os.path.isfile(f"{self.path}.{i}.gz"):
+        os.replace(f"{self.path}.{i}.gz", f"{self.path}.{i+1}.gz")
+    if self.__backups:
+      with open(pending, "rb") as source, gzip.open(f"{self.path}.1.gz.tmp", "wb") as target:
+        shutil.copyfileobj(source, target)
+      os.replace(f"{self.path}.1.gz.tmp", f"{self.path}.1.gz")
+    os.remove(pending)
+
+
+class LogCollector:
+  # reads the output pipes of all nodes without blocking, writes rotated logs and keeps per node metrics
+  def __init__(self, logs_dir: str, stats_path: str, max_bytes: int, backups: int) -> None:
+    self.__logs_dir = logs_dir
+    self.__stats_path = stats_path
+    self.__max_bytes = max_bytes
+    self.__backups = backups
+    self.__selector = selectors.DefaultSelector()
+    self.__compressor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    self.__logs = {}
+    self.__metrics = {}
+    self.__partial = {}
+    self.__stats_written_at = 0
+    os.makedirs(logs_dir, exist_ok=True)
+
+  # start collecting the output of node index from pipe
+  def Add(self, index: int, pipe) -> None:
+    if index not in self.__logs:
+      self.__logs[index] = RotatingLog(os.path.join(self.__logs_dir, f"node-{index}.log"), self.__max_bytes, self.__backups, self.__compressor)
+      self.__metrics[index] = NodeMetrics(index)
+    else:
+      # a restarted node has no peers and an empty txpool, its height and totals carry on
+      self.__metrics[index].peers = 0
+      self.__metrics[index].txpool_size = 0
+    self.__partial[index] = b""
+    os.set_blocking(pipe.fileno(), False)
+    self.__selector.register(pipe, selectors.EVENT_READ, index)
+
+  # call callback from Poll whenever fileobj is readable, lets others share the loop
+  def Watch(self, fileobj, callback) -> None:
+    self.__selector.register(fileobj, selectors.EVENT_READ, callback)
+
+  def Metrics(self, index: int) -> NodeMetrics:
+    return self.__metrics[index]
+
+  # number of pipes that are still open
+  def Open(self) -> int:
+    return len([key for key in self.__selector.get_map().values() if not callable(key.data)])
+
+  # wait up to timeout for output and handle everything that is ready
+  def Poll(self, timeout: float) -> None:
+    if self.__selector.get_map():
+      for key, _ in self.__selector.select(timeout):
+        if callable(key.data):
+          key.data()
+        else:
+          self.__Read(key.fileobj, key.data)
+    else:
+      time.sleep(timeout)
+
+    if time.monotonic() - self.__stats_written_at >= 1:
+      self.WriteStats()
+
+  # collect until every node closed its output
+  def Run(self) -> None:
+    while self.Open():
+      self.Poll(1)
+    self.Close()
+
+  def WriteStats(self) -> None:
+    for log in self.__logs.values():
+      log.Flush()
+    WriteJsonAtomic(self.__stats_path, {str(index): metrics.ToDict() for index, metrics in sorted(self.__metrics.items())})
+    self.__stats_written_at = time.monotonic()
+
+  def Close(self) -> None:
+    for key in list(self.__selector.get_map().values()):
+      if callable(key.data):
+        self.__selector.unregister(key.fileobj)
+      else:
+        self.__Unregister(key.fileobj, key.data)
+    self.WriteStats()
+    self.__compressor.shutdown(wait=True)
+    for log in self.__logs.values():
+      log.Close()
+
+  def __Read(self, pipe, index: int) -> None:
+    try:
+      data = os.read(pipe.fileno(), 65536)
+    except BlockingIOError:
+      return
+    if not data:
+      self.__Unregister(pipe, index)
+      return
+
+    self.__logs[index].Write(data)
+    # only complete lines are parsed, the rest waits for the next read
+    lines = (self.__partial[index] + data).split(b"\n")
+    self.__partial[index] = lines.pop()
+    if len(self.__partial[index]) > MAX_LINE:
+      lines.append(self.__partial[index])
+      self.__partial[index] = b""
+    for line in lines:
+      self.__metrics[index].Parse(line.decode("utf-8", errors="replace"))
+
+  def __Unregister(self, pipe, index: int) -> None:
+    self.__selector.unregister(pipe)
+    pipe.close()
+    if self.__partial.get(index):
+      self.__metrics[index].Parse(self.__partial[index].decode("utf-8", errors="replace"))
+      self.__partial[index] = b""
+
+
+# last count lines of path matching pattern, read backwards in blocks so big files are never loaded whole
+def TailLines(path: str, count: int, pattern: re.Pattern = None, block_size: int = 64 * 1024) -> list:
+  lines = []
+  if count <= 0 or not os.path.isfile(path):
+    return lines
+  with open(path, "rb") as log_file:
+    position = log_file.seek(0, os.SEEK_END)
+    rest = b""
+    while position > 0 and len(lines) < count:
+      read_size = min(block_size, position)
+      position -= read_size
+      log_file.seek(position)
+      block = log_file.read(read_size) + rest
+      parts = block.split(b"\n")
+      # the first part may continue in the previous block
+      rest = parts.pop(0) if position > 0 else b""
+      for part in reversed(parts):
+        line = part.decode("utf-8", errors="replace")
+        if line and (pattern is None or pattern.search(line)):
+          lines.append(line)
+          if len(lines) == count:
+            break
+      if len(rest) > MAX_LINE:
+        rest = b""
+  lines.reverse()
+  return lines
+
+def _PrintLines(name: str, lines: list, pattern: re.Pattern = None) -> None:
+  for line in lines:
+    line = line.decode("utf-8", errors="replace")
+    if pattern is None or pattern.search(line):
+      print(f"[{name}] {line}", flush=True)
+
+# print new lines of all files as they are written, reopening files that got rotated
+def FollowLogs(paths: dict, pattern: re.Pattern = None, interval: float = 0.5) -> None:
+  files = {}
+  try:
+    while True:
+      for name, path in paths.items():
+        try:
+          stat = os.stat(path)
+        except FileNotFoundError:
+          continue
+        log_file, inode, partial = files.get(name, (None, None, b""))
+        if log_file is None or inode != stat.st_ino:
+          if log_file:
+            # the lines written right before the rotation are still in the old file
+            lines = (partial + log_file.read()).split(b"\n")
+            # nothing more gets appended, so an unfinished last line is printed as is
+            if not lines[-1]:
+              lines.pop()
+            _PrintLines(name, lines, pattern)
+            log_file.close()
+          log_file = open(path, "rb")
+          # start at the end the first time, from the top after a rotation
+          if inode is None:
+            log_file.seek(0, os.SEEK_END)
+          inode, partial = stat.st_ino, b""
+        lines = (partial + log_file.read()).split(b"\n")
+        partial = lines.pop()[-MAX_LINE:]
+        _PrintLines(name, lines, pattern)
+        files[name] = (log_file, inode, partial)
+      time.sleep(interval)
+  finally:
+    for log_file, _, _ in files.values():
+      log_file.close()
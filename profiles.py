@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+import os
+import re
+import json
+import socket
+
+from helpers import FileLock
+
+
+DEFAULT_PROFILE = "default"
+# a plain file name, never "." or ".." or anything starting with a dash
+PROFILE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+# first port of every port kind, each kind owns the PORT_SPAN ports after it
+PORT_BASES = {"libp2p_start_port": 20001, "grpc_start_port": 30001, "json_rpc_start_port": 40001}
+PORT_SPAN = 10000
+# profiles get port blocks at multiples of this offset
+PORT_BLOCK = 100
+
+
+# storage dir of a profile, the default profile keeps using the top level storage dir
+def StorageDir(storage_root: str, profile: str) -> str:
+  if profile == DEFAULT_PROFILE:
+    return storage_root
+  return os.path.join(storage_root, "profiles", profile)
+
+# default folder for the data, logs and clone of a profile
+def ProfileRoot(profile: str) -> str:
+  if profile == DEFAULT_PROFILE:
+    return "/tmp/polygon"
+  return f"/tmp/polygon/profiles/{profile}"
+
+# name -> storage dir of every profile that has settings stored
+def ListProfiles(storage_root: str) -> dict:
+  profiles = {}
+  if os.path.isfile(os.path.join(storage_root, "config.json")):
+    profiles[DEFAULT_PROFILE] = storage_root
+  profiles_dir = os.path.join(storage_root, "profiles")
+  if os.path.isdir(profiles_dir):
+    for name in sorted(os.listdir(profiles_dir)):
+      if os.path.isfile(os.path.join(profiles_dir, name, "config.json")):
+        profiles[name] = os.path.join(profiles_dir, name)
+  return profiles
+
+# [start, end) port ranges used by the nodes of a profile
+def PortRanges(settings: dict) -> list:
+  nodes = int(settings["validators"]) + int(settings["non_validators"])
+  return [(int(settings[kind]), int(settings[kind]) + nodes) for kind in PORT_BASES]
+
+# ports from the list that something else is already bound to
+def BusyPorts(ports: list, host: str = "127.0.0.1") -> list:
+  busy = []
+  for port in ports:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+      # like the nodes, ignore connections still in TIME_WAIT
+      probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+      try:
+        probe.bind((host, port))
+      except OSError:
+        busy.append(port)
+  return busy
+
+def Overlaps(ranges: list, taken: list) -> bool:
+  return any(start < taken_end and taken_start < end for start, end in ranges for taken_start, taken_end in taken)
+
+# first port block for node_count nodes that no other profile uses and that is free to bind right now
+def AllocatePorts(node_count: int, taken: list) -> dict:
+  step = PORT_BLOCK * ((node_count + PORT_BLOCK - 1) // PORT_BLOCK)
+  for offset in range(0, PORT_SPAN - node_count + 1, step):
+    ports = {kind: base + offset for kind, base in PORT_BASES.items()}
+    ranges = [(start, start + node_count) for start in ports.values()]
+    if Overlaps(ranges, taken):
+      continue
+    if BusyPorts([port for start, end in ranges for port in range(start, end)]):
+      continue
+    return ports
+  raise RuntimeError(f"No free port block left for {node_count} nodes")
+
+
+class ProfileLock(FileLock):
+  # serializes port allocation between psdk-tools runs on the same host
+  def __init__(self, storage_root: str) -> None:
+    super().__init__(os.path.join(storage_root, "profiles.lock"))
+
+
+# settings of every profile except the one named
+def OtherProfileSettings(storage_root: str, profile: str) -> dict:
+  settings = {}
+  for name, storage_dir in ListProfiles(storage_root).items():
+    if name != profile:
+      with open(os.path.join(storage_dir, "config.json")) as json_settings:
+        settings[name] = json.load(json_settings)
+  return settings
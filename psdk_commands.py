@@ -3,39 +3,102 @@ import argparse
 import sys
 import os
 import subprocess
-import signal
 import shutil
 import platform
 import json
-# import local git package
-sys.path.append(os.path.dirname(__file__)+'/vendor/git')
-from git import Repo
-
-from helpers import UserInputBool
-
+import concurrent.futures
+import asyncio
+import time
+import re
+import glob
+import tempfile
+import contextlib
+from helpers import UserInputBool, WriteJsonAtomic, ReadJsonObject
+from build_cache import BuildCache
+from git_cache import GitCache
+from git.exc import GitCommandError
+from readiness import WaitForCluster, ReportReadiness, DEFAULT_MAX_PEERS
+from bench import Bench, BenchKeys
+from ethtx import Address
+from log_collector import LogCollector, TailLines, FollowLogs
+from supervisor import Supervisor, Node, SendCommand, StopProcessGroups
+from snapshot import Snapshots, RemovePath
+from profiles import PORT_BASES, DEFAULT_PROFILE, PROFILE_NAME_PATTERN, StorageDir, ProfileRoot, ListProfiles, PortRanges, BusyPorts, Overlaps, AllocatePorts, ProfileLock, OtherProfileSettings
+from genesis import WriteGenesis, PremineAccounts, GenesisInputsHash, DEFAULT_GAS_LIMIT
+from timing import BringUpTimer, PrintPhases
+from selftest import KnownAnswerFailures
+
+# files the tool writes into the logs folder, destroy leaves everything else there alone
+LOG_FILE_PATTERNS = ("node-*.log*", "supervisor.log", "bringup-*.json", "bench-*.json")
 
 class PsdkCommands:
     
   def Run(self):
     
     self.__parser = argparse.ArgumentParser()
-    self.__parser.add_argument("-c", "--command",dest="command",default="",help="The command you would like to run against all nodes. For multiple commands \" \" are required. Default: start new chain")
+    self.__parser.add_argument("-c", "--command",dest="command",default="",help="The command you would like to run against all nodes: start new chain, start, stop, status, list, destroy, wait, bench, selftest, logs, stats, \"snapshot NAME\", \"restore NAME\", snapshots. For multiple commands \" \" are required. Default: start new chain")
     self.__parser.add_argument("-b", "--branch",dest="branch",default="develop",help="PolygonSDK branch that will be cloned. Default: develop")
-    self.__parser.add_argument("-d", "--dir",dest="clone_path",default="/tmp/polygon/polygon-sdk",help="Folder to clone repo into. Default: /tmp/polygon-sdk")
-    self.__parser.add_argument("-pd", "--psdk-data",dest="psdk_data",default="/tmp/polygon/data",help="Folder to put the PolygonSDK data files. Default: /tmp/polygon/data")
-    self.__parser.add_argument("-pl", "--psdk-logs",dest="psdk_logs",default="/tmp/polygon/logs",help="Folder to put the PolygonSDK log files. Default: /tmp/polygon/logs")
-    self.__parser.add_argument("-vn", "--validator-nodes",dest="validators",default=4,help="The number of validator nodes. Default: 4")
-    self.__parser.add_argument("-n", "--non-validator-nodes",dest="non_validators",default=2,help="The number of non-validator nodes. Default: 2")
-    self.__parser.add_argument("-p", "--l2p-start-port",dest="libp2p_start_port",default=20001,help="The starting port for libp2p. Default: 20001")
-    self.__parser.add_argument("-g", "--grpc-start-port",dest="grpc_start_port",default=30001,help="The starting port for libp2p. Default: 20001")
-    self.__parser.add_argument("-j", "--json-rpc-start-port",dest="json_rpc_start_port",default=40001,help="The starting port for libp2p. Default: 20001")
-    self.__parser.add_argument("-pm", "--premine-address",dest="premine_addresses",default="0x228466F2C715CbEC05dEAbfAc040ce3619d7CF0B",nargs="*",help="Premine addresses. Add multiple addresses with space in between. Default: 0x228466F2C715CbEC05dEAbfAc040ce3619d7CF0B")
+    self.__parser.add_argument("-P", "--profile",dest="profile",default=DEFAULT_PROFILE,help="Name of the cluster profile to work on. Every profile has its own settings, data, logs and ports, so many clusters can run side by side. Default: default")
+    self.__parser.add_argument("-d", "--dir",dest="clone_path",default=None,help="Path where the checked out branch is linked. Default: /tmp/polygon/polygon-sdk, /tmp/polygon/profiles/<profile>/polygon-sdk for other profiles")
+    self.__parser.add_argument("-u", "--repo-url",dest="repo_url",default="https://github.com/0xPolygon/polygon-sdk.git",help="PolygonSDK repo to fetch from. Default: https://github.com/0xPolygon/polygon-sdk.git")
+    self.__parser.add_argument("-gc", "--git-cache",dest="git_cache",default="/tmp/polygon/git-cache",help="Folder for the bare repo mirror and the per branch worktrees. Default: /tmp/polygon/git-cache")
+    self.__parser.add_argument("-gd", "--git-depth",dest="git_depth",type=int,default=1,help="History depth to fetch, 0 fetches the full history. Default: 1")
+    self.__parser.add_argument("-pd", "--psdk-data",dest="psdk_data",default=None,help="Folder to put the PolygonSDK data files. Default: /tmp/polygon/data, /tmp/polygon/profiles/<profile>/data for other profiles")
+    self.__parser.add_argument("-pl", "--psdk-logs",dest="psdk_logs",default=None,help="Folder to put the PolygonSDK log files. Default: /tmp/polygon/logs, /tmp/polygon/profiles/<profile>/logs for other profiles")
+    self.__parser.add_argument("-vn", "--validator-nodes",dest="validators",type=int,default=4,help="The number of validator nodes. Default: 4")
+    self.__parser.add_argument("-n", "--non-validator-nodes",dest="non_validators",type=int,default=2,help="The number of non-validator nodes. Default: 2")
+    self.__parser.add_argument("-p", "--l2p-start-port",dest="libp2p_start_port",type=int,default=None,help="The starting port for libp2p. Default: first free port block from 20001")
+    self.__parser.add_argument("-g", "--grpc-start-port",dest="grpc_start_port",type=int,default=None,help="The starting port for gRPC. Default: first free port block from 30001")
+    self.__parser.add_argument("-j", "--json-rpc-start-port",dest="json_rpc_start_port",type=int,default=None,help="The starting port for JSON-RPC. Default: first free port block from 40001")
+    self.__parser.add_argument("-pm", "--premine-address",dest="premine_addresses",default=["0x228466F2C715CbEC05dEAbfAc040ce3619d7CF0B"],nargs="*",help="Premine addresses. Add multiple addresses with space in between. Default: 0x228466F2C715CbEC05dEAbfAc040ce3619d7CF0B")
     self.__parser.add_argument("-pmf", "--premine-funds",dest="premine_funds",default="1000000000000000000000",help="Funds for the premined addresses. All addresses will have this amount premined. Default: 1000000000000000000000")
+    self.__parser.add_argument("-pf", "--premine-file",dest="premine_files",default=[],nargs="*",help="CSV (address[,balance]) or JSONL ({\"address\": ..., \"balance\": ...}) files with more accounts to premine. Accounts without a balance get --premine-funds")
+    self.__parser.add_argument("-ci", "--chain-id",dest="chain_id",type=int,default=100,help="Chain ID of the new chain. Default: 100")
     self.__parser.add_argument("-gl", "--block-gas-limit",dest="block_gas_limit",required=False,help="Set block gas limit")
     self.__parser.add_argument("-ms", "--max-slots",dest="max_slots",default="100000",help="Set max slot limit Default: 100000")
+    self.__parser.add_argument("-iw", "--init-workers",dest="init_workers",type=int,default=os.cpu_count(),help="The number of nodes initialized in parallel. Default: number of CPUs")
+    self.__parser.add_argument("-r", "--reuse",dest="reuse",choices=["ask","yes","no"],default="ask",help="Answer for the 'use existing data' prompts: ask, yes (reuse everything) or no (recreate everything). Default: ask")
+    self.__parser.add_argument("-y", "--yes",dest="reuse",action="store_const",const="yes",help="Reuse existing repo, node data and genesis without prompting. Same as --reuse yes")
+    self.__parser.add_argument("-t", "--timeout",dest="timeout",type=float,default=120,help="Seconds to wait for the cluster to get ready after start and for the wait command. Default: 120")
+    self.__parser.add_argument("-mp", "--max-peers",dest="max_peers",type=int,default=DEFAULT_MAX_PEERS,help="Peer limit of the nodes. A node counts as fully peered once it has min(nodes-1, max peers) peers, 0 requires a full mesh. Default: 40")
+    self.__parser.add_argument("-nw", "--no-wait",dest="no_wait",action="store_true",help="Don't wait for the cluster to get ready after starting it")
+    self.__parser.add_argument("-sw", "--start-wave-size",dest="start_wave_size",type=int,default=0,help="Start the nodes in waves of this many nodes, 0 starts all at once. Default: 0")
+    self.__parser.add_argument("-sd", "--start-wave-delay",dest="start_wave_delay",type=float,default=2,help="Seconds between two start waves. Default: 2")
+    self.__parser.add_argument("-pc", "--pin-cpus",dest="pin_cpus",action="store_true",help="Pin every node to its own share of the available CPUs")
+    self.__parser.add_argument("-st", "--stop-timeout",dest="stop_timeout",type=float,default=10,help="Seconds to wait for nodes to exit after SIGTERM before they are killed. Default: 10")
+    self.__parser.add_argument("-sp", "--snapshot-dir",dest="snapshot_dir",default=None,help="Folder to keep cluster snapshots in. Use the same filesystem as the data folder for instant copy-on-write snapshots. Default: snapshots in the profile folder, /tmp/polygon/snapshots for the default profile")
+    self.__parser.add_argument("-lms", "--log-max-size",dest="log_max_size",type=int,default=100,help="Size in MB after which a node log is rotated and compressed. Default: 100")
+    self.__parser.add_argument("-lb", "--log-backups",dest="log_backups",type=int,default=5,help="Number of compressed logs kept per node. Default: 5")
+    self.__parser.add_argument("-ln", "--log-nodes",dest="log_nodes",type=int,default=[],nargs="*",help="Only show logs of these node numbers. Default: all nodes")
+    self.__parser.add_argument("-lg", "--log-grep",dest="log_grep",default=None,help="Only show log lines matching this regex")
+    self.__parser.add_argument("-lt", "--log-tail",dest="log_tail",type=int,default=20,help="Number of lines per node the logs command shows. Default: 20")
+    self.__parser.add_argument("-f", "--follow",dest="follow",action="store_true",help="Keep following new log lines or refreshing stats")
+    self.__parser.add_argument("-ba", "--bench-accounts",dest="bench_accounts",type=int,default=0,help="Number of generated accounts premined at genesis for the bench command. Default: 0")
+    self.__parser.add_argument("-bk", "--bench-keys",dest="bench_keys",default=[],nargs="*",help="Hex private keys of premined accounts the bench command should also send from")
+    self.__parser.add_argument("-bt", "--bench-txs",dest="bench_txs",type=int,default=1000,help="Number of transactions the bench command sends. Default: 1000")
+    self.__parser.add_argument("-bc", "--bench-concurrency",dest="bench_concurrency",type=int,default=32,help="Number of parallel keep-alive connections the bench command sends over. Default: 32")
+    self.__parser.add_argument("-br", "--bench-rate",dest="bench_rate",type=float,default=0,help="Target send rate of the bench command in transactions per second, 0 is unlimited. Default: 0")
+    self.__parser.add_argument("-bo", "--bench-output",dest="bench_output",default=None,help="File to save the bench results to. Default: bench-<time>.json in the logs folder")
+    self.__parser.add_argument("-tr", "--timing-report",dest="timing_report",default=None,help="File to save the start new chain timing report to, in trace event format. Default: bringup-<time>.json in the logs folder")
+    self.__parser.add_argument("-bd", "--bin-dir",dest="bin_dir",default="/tmp/polygon/bin",help="Folder to cache the compiled PolygonSDK binaries in, one per commit. Default: /tmp/polygon/bin")
+    self.__parser.add_argument("-bms", "--bin-cache-max-size",dest="bin_cache_max_size",type=int,default=2048,help="Max size of the binary cache in MB. Oldest binaries are evicted first. Default: 2048")
+    self.__parser.add_argument("-bma", "--bin-cache-max-age",dest="bin_cache_max_age",type=int,default=14,help="Max age of cached binaries in days. Default: 14")
     
 
     self.__args = self.__parser.parse_args()
+
+    # every profile has its own storage, data, logs and clone
+    if not PROFILE_NAME_PATTERN.match(self.__args.profile):
+      self.__parser.error(f"invalid profile name {self.__args.profile}")
+    self.__storage_root = os.path.dirname(os.path.abspath(__file__))+"/storage"
+    self.__storage = StorageDir(self.__storage_root, self.__args.profile)
+    profile_root = ProfileRoot(self.__args.profile)
+    self.__args.clone_path = self.__args.clone_path or f"{profile_root}/polygon-sdk"
+    self.__args.psdk_data = self.__args.psdk_data or f"{profile_root}/data"
+    self.__args.psdk_logs = self.__args.psdk_logs or f"{profile_root}/logs"
+    self.__args.snapshot_dir = self.__args.snapshot_dir or f"{profile_root}/snapshots"
+    # only start new chain times its phases
+    self.__timer = None
     
     self.__RunCommand()
     exit()
@@ -53,37 +116,110 @@ class PsdkCommands:
     elif self.__args.command == 'start':
       self.__StartServer()
 
+    elif self.__args.command == 'list':
+      self.__ListProfiles()
+
+    elif self.__args.command == 'destroy':
+      self.__DestroyProfile()
+
+    elif self.__args.command == 'status':
+      self.__ShowStatus()
+
+    elif self.__args.command == 'wait':
+      self.__WaitForCluster()
+
+    elif self.__args.command == 'bench':
+      self.__RunBench()
+
+    elif self.__args.command == 'selftest':
+      self.__SelfTest()
+
+    elif self.__args.command.split()[:1] in (['snapshot'], ['restore']):
+      command, _, name = self.__args.command.strip().partition(' ')
+      name = name.strip()
+      if not PROFILE_NAME_PATTERN.match(name):
+        sys.exit(f"Give the snapshot a name of letters, digits, '_', '.' and '-': {command} NAME")
+      try:
+        if command == 'snapshot':
+          self.__TakeSnapshot(name)
+        else:
+          self.__RestoreSnapshot(name)
+      except ValueError as error:
+        sys.exit(f"{error}")
+
+    elif self.__args.command == 'snapshots':
+      self.__ListSnapshots()
+
+    elif self.__args.command == 'logs':
+      self.__ShowLogs()
+
+    elif self.__args.command == 'stats':
+      self.__ShowStats()
+
     else:
       self.__parser.print_help()
     
   # start a brand new chain
   def __StartNewChain(self) -> None:
-    # Store user settings to file
-    self.__StoreSettings()
-    # Fetch branch from repo
-    self.__FetchCode()
-    # Build repo
-    self.__VerifyGo()
-    # Init psdk server
-    self.__InitPSDKServer()
-    # Generate genesis.json
-    self.__GenerateGenesisFile()
-    # Start polygon-sdk servers
-    self.__StartServer()
+    # the settings, ports, data dirs and genesis.json all belong to the running nodes
+    if self.__SupervisorRunning():
+      sys.exit("Servers are already running! Stop them before starting a new chain.")
+
+    self.__timer = BringUpTimer(f"start new chain ({self.__args.profile})")
+    try:
+      # Store user settings to file
+      with self.__Phase("StoreSettings"):
+        self.__StoreSettings()
+      # Fetch branch from repo
+      with self.__Phase("FetchCode"):
+        self.__FetchCode()
+      # Build repo
+      with self.__Phase("VerifyGo"):
+        self.__VerifyGo()
+      with self.__Phase("BuildPSDK"):
+        self.__BuildPSDK(self.__args.clone_path)
+      # Init psdk server
+      with self.__Phase("InitPSDKServer"):
+        self.__InitPSDKServer()
+      # Generate genesis.json
+      with self.__Phase("GenerateGenesisFile"):
+        self.__GenerateGenesisFile()
+      # Start polygon-sdk servers
+      with self.__Phase("StartServer"):
+        self.__StartServer()
+    finally:
+      # failed runs are the interesting ones, so the report is written either way
+      report_path = self.__args.timing_report or f"{self.__args.psdk_logs}/bringup-{time.strftime('%Y%m%d-%H%M%S')}.json"
+      PrintPhases(self.__timer.Write(report_path))
+      print(f"Timing report saved to {report_path}")
+
+  # time a step of start new chain, does nothing for the other commands
+  def __Phase(self, name: str):
+    return self.__timer.Phase(name) if self.__timer else contextlib.nullcontext()
  
   # fetch git code from the specified branch
   def __FetchCode(self) -> None:
-    if os.path.isdir(self.__args.clone_path) and UserInputBool("Existing repo found. Would you like to use the existing repo ? [y/N]"):
+    clone_path = self.__args.clone_path
+    # clone path is a symlink into the git cache, anything else is a clone made by hand
+    managed = os.path.islink(clone_path)
+    if os.path.isdir(clone_path) and not managed and UserInputBool("Existing repo found. Would you like to use the existing repo ? [y/N]", self.__args.reuse):
       print("Using the existin repo.")
       return
-    else:
-      print(f"Cloning branch {self.__args.branch}...")
-      # remove dir if exists
-      if os.path.isdir(f"{self.__args.clone_path}"):
-        shutil.rmtree(self.__args.clone_path)
-      # clone the repo
-      Repo.clone_from("https://github.com/0xPolygon/polygon-sdk.git",self.__args.clone_path,branch=self.__args.branch)
-      print(f"Branch {self.__args.branch} cloned.")
+
+    # fetch the branch into the mirror and check it out into its own worktree
+    try:
+      worktree = GitCache(self.__args.git_cache, self.__args.repo_url, self.__args.git_depth).Checkout(self.__args.branch)
+    except GitCommandError as error:
+      sys.exit(f"Fetching {self.__args.branch} failed: {str(error.stderr).strip()}")
+
+    # point clone path at the worktree of this branch
+    if os.path.islink(clone_path):
+      os.remove(clone_path)
+    elif os.path.isdir(clone_path):
+      shutil.rmtree(clone_path)
+    os.makedirs(os.path.dirname(clone_path), exist_ok=True)
+    os.symlink(worktree, clone_path)
+    print(f"Branch {self.__args.branch} checked out at {clone_path}.")
   
   # verify that go is available
   def __VerifyGo(self) -> None:
@@ -105,147 +241,500 @@ class PsdkCommands:
       os.environ["PATH"] += os.pathsep + "/usr/local/go/bin"
     
     print("Go is installed. Proceeding...")
+
+  # compile the cloned tree once and reuse the cached binary for every command
+  def __BuildPSDK(self, clone_path: str) -> str:
+    cache = BuildCache(self.__args.bin_dir, self.__args.bin_cache_max_size, self.__args.bin_cache_max_age)
+    self.__psdk_binary = cache.Binary(clone_path)
+    return self.__psdk_binary
   
   # initialize psdk server
   def __InitPSDKServer(self) -> None:
 
-    # init variables
-    validators = []
-    non_validators = []
-    data_index = 1
-
     # create storage dir that will hold node info
-    if not os.path.isdir(os.path.dirname(__file__)+"/storage"):
-      os.mkdir(os.path.dirname(__file__)+"/storage")
-
-    # change dir to cloned folder
-    os.chdir(self.__args.clone_path)
-    # install dependances
-    subprocess.call(f"go install",shell=True)
+    os.makedirs(self.__storage, exist_ok=True)
+
+    # validators get the first data dirs, non validators the ones after them
+    groups = [
+      ("validator", self.__storage+"/init-validators.json", range(1, self.__args.validators+1)),
+      ("non validator", self.__storage+"/init-non_validators.json", range(self.__args.validators+1, self.__args.validators+self.__args.non_validators+1)),
+    ]
+
+    # only init the groups that we don't have json data for already
+    pending = []
+    for name, json_path, indexes in groups:
+      if os.path.isfile(json_path) and UserInputBool(f"Existing {name} node data found. Would you like to use the existing data ? [y/N]", self.__args.reuse):
+        print(f"Using existing {name} data.")
+      else:
+        pending.append((name, json_path, indexes))
+
+    if not pending:
+      return
 
-    #run init for all validators and append incement suffix for dir name if we don't have json data already
-    if os.path.isfile(os.path.dirname(__file__)+"/storage/init-validators.json") and UserInputBool("Existing validator node data found. Would you like to use the existing data ? [y/N]"):
-      print("Using existing validator data.")
-    else:
-      for _ in range(0 , self.__args.validators):
-        # delete existing directory if exists
-        if os.path.isdir(f"{self.__args.psdk_data}-{data_index}"):
-          shutil.rmtree(f"{self.__args.psdk_data}-{data_index}")
-        # init new directory and data
-        validators.append(json.loads(subprocess.run(f"go run main.go secrets init --json --data-dir {self.__args.psdk_data}-{data_index}",shell=True,capture_output=True).stdout.decode("utf-8").rstrip("\n")))
-        data_index += 1
-        # write this information to json file
-      with open(os.path.dirname(__file__)+"/storage/init-validators.json", "w") as json_file:
-        json.dump(validators, json_file, indent=4, sort_keys=True)
-      
-
-    #run init for all non validators and append incement suffix for dir name if we don't have json data already
-    if os.path.isfile(os.path.dirname(__file__)+"/storage/init-non_validators.json") and UserInputBool("Existing non validator node data found. Would you like to use the existing data ? [y/N]"):
-      print("Using existing non validator data.")
-    else:
-      for _ in range(0,self.__args.non_validators):
-         # delete existing directory if exists
-        if os.path.isdir(f"{self.__args.psdk_data}-{data_index}"):
-          shutil.rmtree(f"{self.__args.psdk_data}-{data_index}")
-        # init new directory and data
-        non_validators.append(json.loads(subprocess.run(f"go run main.go secrets init --json --data-dir {self.__args.psdk_data}-{data_index}",shell=True,capture_output=True).stdout.decode("utf-8").rstrip("\n")))
-        data_index += 1
-        # write this information to json file
-      with open(os.path.dirname(__file__)+"/storage/init-non_validators.json","w") as json_file:
-        json.dump(non_validators,json_file,indent=4,sort_keys=True)
+    # run secrets init for every data dir at once
+    data_indexes = [index for _, _, indexes in pending for index in indexes]
+    print(f"Initializing {len(data_indexes)} nodes with {self.__args.init_workers} workers...")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=self.__args.init_workers) as pool:
+      results = dict(zip(data_indexes, pool.map(self.__InitNode, data_indexes)))
+
+    # write this information to json files. the data dirs were recreated either way,
+    # so the old json of a group with a failed node is stale and goes too
+    failed = {index: error for index, (_, error) in results.items() if error}
+    for name, json_path, indexes in pending:
+      if any(index in failed for index in indexes):
+        if os.path.isfile(json_path):
+          os.remove(json_path)
+      else:
+        WriteJsonAtomic(json_path, [results[index][0] for index in indexes], sort_keys=True)
+
+    # report every failed node
+    if failed:
+      for index, error in sorted(failed.items()):
+        print(f"Node {index} ({self.__args.psdk_data}-{index}) init failed: {error}")
+      sys.exit(f"{len(failed)} of {len(data_indexes)} nodes failed to initialize!")
+    print("All nodes initialized.")
+
+  # run secrets init for a single data dir, returns the node info or an error message
+  def __InitNode(self, data_index: int):
+    started, cpu = time.monotonic(), None
+    try:
+      node, error, cpu = self.__SecretsInit(data_index)
+      return node, error
+    finally:
+      if self.__timer:
+        self.__timer.Span("init", data_index, started, time.monotonic(), cpu=cpu)
+
+  # also returns the cpu seconds secrets init used
+  def __SecretsInit(self, data_index: int):
+    data_dir = f"{self.__args.psdk_data}-{data_index}"
+    # delete existing directory if exists
+    try:
+      if os.path.isdir(data_dir):
+        shutil.rmtree(data_dir)
+    except OSError as error:
+      return None, f"can't remove the old data dir: {error}", None
+
+    # stderr goes to a file, a pipe nobody reads while we wait on stdout could fill up and block the node
+    with tempfile.TemporaryFile() as stderr_file:
+      try:
+        process = subprocess.Popen([self.__psdk_binary, "secrets", "init", "--json", "--data-dir", data_dir], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr_file)
+      except OSError as error:
+        return None, f"can't run {self.__psdk_binary}: {error}", None
+      node = ReadJsonObject(process.stdout)
+      # drain stdout so the process can exit
+      process.stdout.read()
+      process.stdout.close()
+      # reap it ourselves to get the cpu time of this child alone
+      _, status, usage = os.wait4(process.pid, 0)
+      process.returncode = os.waitstatus_to_exitcode(status)
+      stderr_file.seek(0)
+      stderr = stderr_file.read().decode("utf-8", errors="replace").strip()
+    cpu = usage.ru_utime + usage.ru_stime
+    if process.returncode != 0:
+      return None, f"exit code {process.returncode}: {stderr}", cpu
+    if node is None:
+      return None, f"no json output: {stderr}", cpu
+    return node, None, cpu
 
   # generate genesis.json
   def __GenerateGenesisFile(self) -> None:
-    # change dir to psdk clone folder
-    os.chdir(self.__args.clone_path)
-
-    if os.path.isfile(f"{os.path.dirname(self.__args.psdk_data)}/genesis.json") and UserInputBool("Genesis file detected. Would you like to use the existing genesis.json file? [y/N]"):
-      print("Using the existing genesis.json file.")
-      return
-
-
-    # first part of init command
-    GenesisInitString = f"go run {self.__args.clone_path}/main.go genesis --consensus ibft"
-    # add all validator keys and boot nodes
-    for i,node in enumerate(json.load(open(os.path.dirname(__file__)+"/storage/init-validators.json"))):
-      GenesisInitString += f" --ibft-validator={node['address']} --bootnode=/ip4/127.0.0.1/tcp/{str(self.__args.libp2p_start_port+i)}/p2p/{node['node_id']}"
-
-    # add premine
-    for address in self.__args.premine_addresses:
-        GenesisInitString += f" --premine={address}:{str(self.__args.premine_funds)}"
-
-    # set block gas limit
-    if self.__args.block_gas_limit:
-        GenesisInitString += f" --block-gas-limit {self.__args.block_gas_limit}"
-
-    # now we can create genesis.json
-    os.system(GenesisInitString)
-    os.system(f"mv {os.curdir}/genesis.json {os.path.dirname(self.__args.psdk_data)}")
-    print(f"Genesis file generated at {os.path.dirname(self.__args.psdk_data)}")
+    genesis_path = f"{os.path.dirname(self.__args.psdk_data)}/genesis.json"
+    hash_path = self.__storage+"/genesis-hash.json"
+    os.makedirs(os.path.dirname(genesis_path), exist_ok=True)
+
+    validators = json.load(open(self.__storage+"/init-validators.json"))
+    bench_addresses = [Address(key) for key in BenchKeys(self.__args.bench_accounts)]
+    params = {
+      "validators": [node['address'] for node in validators],
+      # validators are the boot nodes
+      "bootnodes": [f"/ip4/127.0.0.1/tcp/{int(self.__args.libp2p_start_port)+i}/p2p/{node['node_id']}" for i, node in enumerate(validators)],
+      "premine_addresses": self.__args.premine_addresses + bench_addresses,
+      "premine_funds": self.__args.premine_funds,
+      "chain_id": self.__args.chain_id,
+      "block_gas_limit": int(self.__args.block_gas_limit or DEFAULT_GAS_LIMIT),
+    }
+    inputs_hash = GenesisInputsHash(params, self.__args.premine_files)
+
+    # reuse the file as long as it was built from the same inputs
+    if os.path.isfile(genesis_path):
+      stored_hash = json.load(open(hash_path)).get("hash") if os.path.isfile(hash_path) else None
+      if stored_hash == inputs_hash:
+        print("Genesis inputs unchanged, using the existing genesis.json file.")
+        return
+      if stored_hash is None and UserInputBool("Genesis file detected. Would you like to use the existing genesis.json file? [y/N]", self.__args.reuse):
+        print("Using the existing genesis.json file.")
+        return
+
+    try:
+      premine = PremineAccounts(params["premine_addresses"], self.__args.premine_funds, self.__args.premine_files)
+      accounts = WriteGenesis(genesis_path, params["validators"], params["bootnodes"], premine, params["chain_id"], params["block_gas_limit"])
+    except (ValueError, KeyError, OSError) as error:
+      sys.exit(f"Failed to generate genesis.json: {error}")
+    WriteJsonAtomic(hash_path, {"hash": inputs_hash})
+    print(f"Genesis file generated at {os.path.dirname(self.__args.psdk_data)} with {accounts} premined accounts")
 
   # start psdk server   
   def __StartServer(self) -> None:
 
     # init vars
-    data_index = 0
-    validator_pids = []
-    non_validator_pids = []
+    started_at = time.monotonic()
+    socket_path = self.__storage+"/supervisor.sock"
 
     # get user settings from json file
-    with open(os.path.dirname(__file__)+"/storage/config.json") as json_settings:
-      settings = json.load(json_settings)
-    
+    settings = self.__LoadSettings()
+
+    if self.__SupervisorRunning():
+      print("Servers are already running! Stop them first.")
+      return
+
+    # make sure nothing else holds our ports before launching anything
+    cluster_nodes = self.__ClusterNodes(settings)
+    busy = BusyPorts([node[kind] for node in cluster_nodes for kind in ("grpc_port", "libp2p_port", "json_rpc_port")])
+    if busy:
+      sys.exit(f"Ports {', '.join(str(port) for port in busy)} are already in use! Stop whatever uses them or start a new chain to get other ports.")
 
     # add go binary to path for this session
     os.environ["PATH"] += os.pathsep + "/usr/local/go/bin"
 
-    # change dir to clone dir
-    os.chdir(settings['clone_path'])
-
-    # run server command for every validator and redirect the output to file
-    for _ in json.loads(open(os.path.dirname(__file__)+"/storage/init-validators.json").read()):
-      cmd = f"go run main.go server --max-slots={settings['max_slots']} --data-dir {settings['psdk_data']}-{data_index+1} --chain {os.path.dirname(settings['psdk_data'])}/genesis.json --grpc 127.0.0.1:{settings['grpc_start_port']+data_index} --libp2p 127.0.0.1:{settings['libp2p_start_port']+data_index} --jsonrpc 127.0.0.1:{settings['json_rpc_start_port']+data_index} --seal --log-level debug"
-      validator_pids.append(subprocess.Popen(cmd, preexec_fn=os.setsid, shell=True, stdout=open(f"{os.path.dirname(settings['psdk_data'])}/node-{data_index+1}.log","w"), stderr=open(f"{os.path.dirname(settings['psdk_data'])}/node-{data_index+1}.log","w")).pid)
-      data_index += 1
-    # run server command for every non validator and redirect the output to file
-    for _ in json.loads(open(os.path.dirname(__file__)+"/storage/init-non_validators.json").read()):
-      cmd = f"go run main.go server --max-slots={settings['max_slots']} --data-dir {settings['psdk_data']}-{data_index+1} --chain {os.path.dirname(settings['psdk_data'])}/genesis.json --grpc 127.0.0.1:{settings['grpc_start_port']+data_index} --libp2p 127.0.0.1:{settings['libp2p_start_port']+data_index} --jsonrpc 127.0.0.1:{settings['json_rpc_start_port']+data_index} --log-level debug"
-      non_validator_pids.append(subprocess.Popen(cmd, preexec_fn=os.setsid, shell=True, stdout=open(f"{os.path.dirname(settings['psdk_data'])}/node-{data_index+1}.log","w"), stderr=open(f"{os.path.dirname(settings['psdk_data'])}/node-{data_index+1}.log","w")).pid)
-      data_index += 1
-    
-    # save PIDs to file
-    with open(os.path.dirname(__file__)+"/storage/validator-pids.json","w") as json_file:
-      json.dump(validator_pids,json_file,indent=4)
-        
-    with open(os.path.dirname(__file__)+"/storage/non_validator-pids.json","w") as json_file:
-      json.dump(non_validator_pids,json_file,indent=4)
+    # build the binary if this commit is not cached yet
+    psdk_binary = BuildCache(settings.get('bin_dir', '/tmp/polygon/bin'), settings.get('bin_cache_max_size', 2048), settings.get('bin_cache_max_age', 14)).Binary(settings['clone_path'])
+
+    # split the available cpus evenly between the nodes
+    cpus = sorted(os.sched_getaffinity(0)) if self.__args.pin_cpus else []
+    cpus_per_node = max(1, len(cpus) // len(cluster_nodes)) if cpus else 0
+
+    # server command for every validator and non validator
+    nodes = []
+    for data_index, node in enumerate(cluster_nodes):
+      args = [psdk_binary, "server", f"--max-slots={settings['max_slots']}", "--data-dir", f"{settings['psdk_data']}-{node['index']}", "--chain", f"{os.path.dirname(settings['psdk_data'])}/genesis.json", "--grpc", f"127.0.0.1:{node['grpc_port']}", "--libp2p", f"127.0.0.1:{node['libp2p_port']}", "--jsonrpc", f"127.0.0.1:{node['json_rpc_port']}", "--log-level", "debug"]
+      if node["validator"]:
+        args.append("--seal")
+      node_cpus = {cpus[(data_index*cpus_per_node + i) % len(cpus)] for i in range(cpus_per_node)}
+      nodes.append(Node(node["index"], node["validator"], args, node_cpus))
+
+    # the supervisor runs detached and owns the node processes from here on
+    os.makedirs(settings['psdk_logs'], exist_ok=True)
+    sys.stdout.flush()
+    if os.fork() == 0:
+      os.setsid()
+      try:
+        supervisor_log = os.open(f"{settings['psdk_logs']}/supervisor.log", os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+        os.dup2(supervisor_log, 1)
+        os.dup2(supervisor_log, 2)
+        collector = LogCollector(settings['psdk_logs'], self.__storage+"/stats.json", settings.get('log_max_size', 100)*1024*1024, settings.get('log_backups', 5))
+        Supervisor(nodes, self.__storage, collector, self.__args.start_wave_size, self.__args.start_wave_delay, self.__args.stop_timeout).Run()
+      finally:
+        os._exit(0)
+
+    # wait for the supervisor to take commands
+    with self.__Phase("LaunchSupervisor"):
+      self.__WaitForSupervisor(socket_path, settings)
+
+    print(f"All servers started! Check the logs in {settings['psdk_logs']} for activity.")
+
+    if not self.__args.no_wait:
+      self.__WaitForCluster(started_at)
+    elif self.__timer:
+      self.__RecordNodeStarts(started_at)
+
+  # block until the forked supervisor answers on its socket
+  def __WaitForSupervisor(self, socket_path: str, settings: dict) -> None:
+    deadline = time.monotonic() + 10
+    while True:
+      try:
+        if SendCommand(socket_path, {"command": "status"}, max(0.1, deadline - time.monotonic())) is not None:
+          return
+      except TimeoutError:
+        # listening, but too busy spawning nodes to answer in time
+        pass
+      if time.monotonic() > deadline:
+        sys.exit(f"Supervisor didn't come up! Check {settings['psdk_logs']}/supervisor.log")
+      time.sleep(0.05)
+
+  # wait until every node is listening, fully peered and the chain is sealing blocks
+  def __WaitForCluster(self, started_at: float = None) -> None:
+    settings = self.__LoadSettings()
+
+    nodes = self.__ClusterNodes(settings)
+    print(f"Waiting up to {self.__args.timeout}s for {len(nodes)} nodes to get ready...")
+    with self.__Phase("WaitForCluster"):
+      statuses = asyncio.run(WaitForCluster(nodes, self.__args.timeout, started_at, max_peers=self.__args.max_peers))
+    if self.__timer:
+      self.__RecordNodeStarts(started_at, statuses)
+    if not ReportReadiness(statuses):
+      sys.exit("Cluster is not ready!")
+    print("Cluster is ready!")
+
+  # add a span per node from its launch by the supervisor until it got ready
+  def __RecordNodeStarts(self, started_at: float, statuses: list = None) -> None:
+    try:
+      response = SendCommand(self.__storage+"/supervisor.sock", {"command": "status"})
+    except TimeoutError:
+      response = None
+    if response is None:
+      return
+    now = time.monotonic()
+    statuses = {status["index"]: status for status in statuses or []}
+    for node in response["nodes"]:
+      if node["uptime"] is None:
+        continue
+      # uptime counts from the last (re)start, monotonic time is shared with the supervisor
+      launched = now - node["uptime"]
+      status = statuses.get(node["index"], {})
+      ready_at = started_at + status["time_to_ready"] if status.get("ready") else now
+      self.__timer.Span("start", node["index"], launched, max(launched, ready_at), launch_delay=launched - started_at, ready=status.get("ready"), time_to_ready=status.get("time_to_ready"), restarts=node["restarts"])
+
+  # load the running cluster with signed transfers and save the results
+  def __RunBench(self) -> None:
+    settings = self.__LoadSettings()
+
+    # a broken hash or signature only shows up as rejected transactions, so check the known answers first
+    failures = KnownAnswerFailures()
+    if failures:
+      sys.exit("Self test failed:\n" + "\n".join(failures))
+
+    keys = BenchKeys(settings.get('bench_accounts', 0)) + [int(key, 16) for key in self.__args.bench_keys]
+    if not keys:
+      sys.exit("No accounts to send from! Start a new chain with --bench-accounts or pass the premine keys with --bench-keys.")
+
+    with open(f"{os.path.dirname(settings['psdk_data'])}/genesis.json") as genesis_file:
+      chain_id = json.load(genesis_file)["params"]["chainID"]
+
+    endpoints = [(node["host"], node["json_rpc_port"]) for node in self.__ClusterNodes(settings)]
+    bench = Bench(endpoints, keys, chain_id, self.__args.bench_txs, self.__args.bench_concurrency, self.__args.bench_rate, self.__args.timeout)
+    results = asyncio.run(bench.Run())
+
+    print(f"Submitted: {results['submitted']} ({results['submitted_tps']:.1f} TPS), confirmed: {results['confirmed']} ({results['confirmed_tps']:.1f} TPS), rejected: {results['rejected']}, errors: {results['errors']}")
+    if results["stranded"] or results["skipped"]:
+      print(f"Behind a nonce gap: {results['stranded']} accepted but never mined, {results['skipped']} not sent")
+    for message, count in results["rejections"].items():
+      print(f"  rejected {count}x: {message}")
+    if results["confirmed"]:
+      print(f"Inclusion latency p50: {results['latency']['p50']:.3f}s p95: {results['latency']['p95']:.3f}s p99: {results['latency']['p99']:.3f}s")
+
+    output = self.__args.bench_output or f"{settings['psdk_logs']}/bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    results["settings"] = {key: settings.get(key) for key in ("branch", "validators", "non_validators", "max_slots", "block_gas_limit")}
+    WriteJsonAtomic(output, results)
+    print(f"Results saved to {output}")
+
+  # check the transaction signing and json rpc code against known answers
+  def __SelfTest(self) -> None:
+    failures = KnownAnswerFailures()
+    for failure in failures:
+      print(failure)
+    if failures:
+      sys.exit(f"{len(failures)} known answer checks failed!")
+    print("All known answer checks passed.")
+
+  # tail or filter the logs of all nodes
+  def __ShowLogs(self) -> None:
+    settings = self.__LoadSettings()
+
+    pattern = re.compile(self.__args.log_grep) if self.__args.log_grep else None
+    indexes = self.__args.log_nodes or [node["index"] for node in self.__ClusterNodes(settings)]
+    paths = {f"node-{index}": f"{settings['psdk_logs']}/node-{index}.log" for index in indexes}
+
+    # hclog lines start with a timestamp, so sorting merges the nodes in time order
+    lines = []
+    for name, path in paths.items():
+      lines += [(line, name) for line in TailLines(path, self.__args.log_tail, pattern)]
+    for line, name in sorted(lines):
+      print(f"[{name}] {line}")
+
+    if self.__args.follow:
+      try:
+        FollowLogs(paths, pattern)
+      except KeyboardInterrupt:
+        pass
+
+  # show the counters the log collector extracted from the node logs
+  def __ShowStats(self) -> None:
+    stats_path = self.__storage+"/stats.json"
+    try:
+      while True:
+        if not os.path.isfile(stats_path):
+          sys.exit("No stats yet. Start the servers first!")
+        with open(stats_path) as stats_file:
+          stats = json.load(stats_file)
+
+        if self.__args.follow:
+          print("\033[2J\033[H", end="")
+        print(f"{'node':>6} {'height':>8} {'rounds':>8} {'peers':>6} {'txpool':>8} {'lines':>10} {'last line':>10}")
+        for index, node in stats.items():
+          last_line = f"{time.time() - node['last_line_at']:.0f}s ago" if node["last_line_at"] else "-"
+          print(f"{index:>6} {node['height']:>8} {node['round_changes']:>8} {node['peers']:>6} {node['txpool_size']:>8} {node['lines']:>10} {last_line:>10}")
+
+        if not self.__args.follow:
+          return
+        time.sleep(1)
+    except KeyboardInterrupt:
+      pass
+
+  # save all node data dirs, genesis.json and the storage metadata under a name
+  def __TakeSnapshot(self, name: str) -> None:
+    settings = self.__LoadSettings()
+    if self.__SupervisorRunning():
+      sys.exit("Servers are running! Stop them before taking a snapshot.")
+
+    snapshots = Snapshots(self.__args.snapshot_dir)
+    if snapshots.Exists(name) and not UserInputBool(f"Snapshot {name} already exists. Would you like to overwrite it? [y/N]", self.__args.reuse):
+      return
 
-    print(f"All servers started! Check the logs in {os.path.dirname(settings['psdk_data'])} for activity.")
+    manifest = snapshots.Take(name, self.__SnapshotSources(settings), self.__args.profile)
+    print(f"Snapshot {name} taken in {manifest['duration']:.2f}s ({manifest['method']} {manifest['files']}).")
+
+  # put the data dirs, genesis.json and storage metadata of a snapshot back in place
+  def __RestoreSnapshot(self, name: str) -> None:
+    if self.__SupervisorRunning():
+      sys.exit("Servers are running! Stop them before restoring a snapshot.")
+
+    snapshots = Snapshots(self.__args.snapshot_dir)
+    if not snapshots.Exists(name):
+      sys.exit(f"Snapshot {name} not found in {self.__args.snapshot_dir}!")
+
+    result = snapshots.Restore(name, self.__args.profile)
+    print(f"Snapshot {name} restored in {result['duration']:.2f}s ({result['method']} {result['files']}). Use the start command to run it.")
+
+  def __ListSnapshots(self) -> None:
+    for manifest in Snapshots(self.__args.snapshot_dir).List():
+      print(f"{manifest['name']:<24} {manifest.get('profile', DEFAULT_PROFILE):<20} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(manifest['created']))} {manifest['method']:<8} {len(manifest['targets'])} paths")
+
+  # everything needed to bring a cluster back, keyed by its name inside the snapshot
+  def __SnapshotSources(self, settings: dict) -> dict:
+    sources = {}
+    for node in self.__ClusterNodes(settings):
+      sources[f"data-{node['index']}"] = f"{settings['psdk_data']}-{node['index']}"
+    sources["genesis.json"] = f"{os.path.dirname(settings['psdk_data'])}/genesis.json"
+    # pids and stats belong to the running processes, not to the chain
+    for file_name in os.listdir(self.__storage):
+      if file_name.endswith(".json") and file_name not in ("validator-pids.json", "non_validator-pids.json", "stats.json"):
+        sources[f"storage/{file_name}"] = os.path.abspath(self.__storage+"/"+file_name)
+    return sources
+
+  # show every profile with its state and port blocks
+  def __ListProfiles(self) -> None:
+    print(f"{'profile':<20} {'state':<8} {'nodes':>5} {'libp2p':>12} {'grpc':>12} {'json-rpc':>12} data")
+    for name, storage_dir in ListProfiles(self.__storage_root).items():
+      with open(storage_dir+"/config.json") as json_settings:
+        settings = json.load(json_settings)
+      state = "running" if self.__SupervisorRunning(storage_dir) else "stopped"
+      ranges = [f"{start}-{end-1}" for start, end in PortRanges(settings)]
+      print(f"{name:<20} {state:<8} {int(settings['validators'])+int(settings['non_validators']):>5} {ranges[0]:>12} {ranges[1]:>12} {ranges[2]:>12} {os.path.dirname(settings['psdk_data'])}")
+
+  # stop the profile's cluster and remove its data, logs and settings
+  def __DestroyProfile(self) -> None:
+    settings = self.__LoadSettings()
+    if not UserInputBool(f"This removes all data, logs and settings of profile {self.__args.profile}. Continue? [y/N]", self.__args.reuse):
+      return
+
+    if self.__SupervisorRunning():
+      self.__StopAllServers()
+
+    # from the settings, the init json files are missing after a failed init
+    paths = [f"{settings['psdk_data']}-{index}" for index in range(1, int(settings['validators'])+int(settings['non_validators'])+1)]
+    paths.append(f"{os.path.dirname(settings['psdk_data'])}/genesis.json")
+    # the logs folder may be shared with caches or other profiles (-pl /tmp/polygon)
+    paths += [path for pattern in LOG_FILE_PATTERNS for path in glob.glob(os.path.join(glob.escape(settings['psdk_logs']), pattern))]
+    # only the link to the worktree, the git cache stays
+    if os.path.islink(settings['clone_path']):
+      paths.append(settings['clone_path'])
+    for path in paths:
+      RemovePath(path)
+    if os.path.isdir(settings['psdk_logs']) and not os.listdir(settings['psdk_logs']):
+      os.rmdir(settings['psdk_logs'])
+
+    if self.__args.profile == DEFAULT_PROFILE:
+      # the default storage dir also holds the other profiles
+      for file_name in os.listdir(self.__storage):
+        if os.path.isfile(self.__storage+"/"+file_name) and file_name != "profiles.lock":
+          os.remove(self.__storage+"/"+file_name)
+    else:
+      RemovePath(self.__storage)
+    print(f"Profile {self.__args.profile} destroyed. Snapshots in {self.__args.snapshot_dir} were kept.")
+
+  # addresses of every node, validators first, in data dir order
+  def __ClusterNodes(self, settings: dict) -> list:
+    validators = json.load(open(self.__storage+"/init-validators.json"))
+    non_validators = json.load(open(self.__storage+"/init-non_validators.json"))
+    nodes = []
+    for data_index in range(len(validators) + len(non_validators)):
+      nodes.append({
+        "index": data_index+1,
+        "validator": data_index < len(validators),
+        "host": "127.0.0.1",
+        "grpc_port": int(settings['grpc_start_port'])+data_index,
+        "libp2p_port": int(settings['libp2p_start_port'])+data_index,
+        "json_rpc_port": int(settings['json_rpc_start_port'])+data_index,
+      })
+    return nodes
 
   # stop psdk server
   def __StopAllServers(self) -> None:
 
-    if not os.path.isfile(os.path.dirname(__file__)+"/storage/validator-pids.json") or not os.path.isfile(os.path.dirname(__file__)+"/storage/non_validator-pids.json"):
+    # the supervisor stops all nodes in parallel and exits, killing what is left after our stop timeout
+    try:
+      response = SendCommand(self.__storage+"/supervisor.sock", {"command": "stop", "timeout": self.__args.stop_timeout}, self.__args.stop_timeout+10)
+    except TimeoutError:
+      sys.exit("Supervisor didn't finish stopping the nodes in time! Check supervisor.log in the logs folder.")
+    if response is not None:
+      # the supervisor removes its socket last, once its logs and stats are flushed
+      deadline = time.monotonic() + 5
+      while os.path.exists(self.__storage+"/supervisor.sock") and time.monotonic() < deadline:
+        time.sleep(0.05)
+      print(f"All servers stopped! {response.get('terminated', 0)} exited, {response.get('killed', 0)} had to be killed.")
+      return
+
+    # no supervisor, fall back to the PID files
+    pid_files = [self.__storage+"/validator-pids.json", self.__storage+"/non_validator-pids.json"]
+    if not any(os.path.isfile(pid_file) for pid_file in pid_files):
       print("No servers running. You can't kill any server processes!")
       return
-    
-    # kill portgroup of PIDs returned from running the server
-    for pid in json.loads(open(os.path.dirname(__file__)+"/storage/validator-pids.json").read()):
-      os.killpg(os.getpgid(pid),signal.SIGTERM)
-    
-    # remove PIDs file
-    os.remove(os.path.dirname(__file__)+"/storage/validator-pids.json")
- 
-    # kill portgroup of PIDs returned from running the server
-    for pid in json.loads(open(os.path.dirname(__file__)+"/storage/non_validator-pids.json").read()):
-      os.killpg(os.getpgid(pid),signal.SIGTERM)
-      
-    # remove PIDs file
-    os.remove(os.path.dirname(__file__)+"/storage/non_validator-pids.json")
 
-    
-    print("All servers stopped!")
-  
+    pgids = []
+    for pid_file in pid_files:
+      if os.path.isfile(pid_file):
+        for pid in json.load(open(pid_file)):
+          try:
+            pgids.append(os.getpgid(pid))
+          except ProcessLookupError:
+            pass
+        # remove PIDs file
+        os.remove(pid_file)
+
+    terminated, killed = StopProcessGroups(pgids, self.__args.stop_timeout)
+    print(f"All servers stopped! {terminated} exited, {killed} had to be killed.")
+
+  # show the state of every node the supervisor owns
+  def __ShowStatus(self) -> None:
+    try:
+      response = SendCommand(self.__storage+"/supervisor.sock", {"command": "status"})
+    except TimeoutError:
+      sys.exit("Supervisor is too busy to answer, try again.")
+    if response is None:
+      print("No servers running.")
+      return
+    print(f"{'node':>6} {'type':>14} {'pid':>8} {'state':>11} {'restarts':>9} {'uptime':>9} cpus")
+    for node in response["nodes"]:
+      uptime = f"{node['uptime']:.0f}s" if node["uptime"] is not None else "-"
+      cpus = ",".join(str(cpu) for cpu in node["cpus"]) if node["cpus"] else "-"
+      print(f"{node['index']:>6} {'validator' if node['validator'] else 'non validator':>14} {node['pid'] or '-':>8} {node['state']:>11} {node['restarts']:>9} {uptime:>9} {cpus}")
+
+  # settings of the profile, a mistyped -P ends here
+  def __LoadSettings(self) -> dict:
+    if not os.path.isfile(self.__storage+"/config.json"):
+      sys.exit(f"Profile {self.__args.profile} not found!")
+    with open(self.__storage+"/config.json") as json_settings:
+      return json.load(json_settings)
+
+  # a supervisor that is too busy to answer in time is still running
+  def __SupervisorRunning(self, storage_dir: str = None) -> bool:
+    try:
+      return SendCommand((storage_dir or self.__storage)+"/supervisor.sock", {"command": "status"}) is not None
+    except TimeoutError:
+      return True
+
   # store user settings to file
   def __StoreSettings(self) -> None:
     settings = {}
@@ -256,17 +745,42 @@ class PsdkCommands:
     settings["psdk_logs"] = self.__args.psdk_logs
     settings["validators"] = self.__args.validators
     settings["non_validators"] = self.__args.non_validators
-    settings["libp2p_start_port"] = self.__args.libp2p_start_port
-    settings["grpc_start_port"] = self.__args.grpc_start_port
-    settings["json_rpc_start_port"] = self.__args.json_rpc_start_port
     settings["premine_addresses"] = self.__args.premine_addresses
     settings["premine_funds"] = self.__args.premine_funds
+    settings["premine_files"] = self.__args.premine_files
+    settings["chain_id"] = self.__args.chain_id
+    settings["bench_accounts"] = self.__args.bench_accounts
+    settings["log_max_size"] = self.__args.log_max_size
+    settings["log_backups"] = self.__args.log_backups
     settings["block_gas_limit"] = self.__args.block_gas_limit
     settings["max_slots"] = self.__args.max_slots
+    settings["bin_dir"] = self.__args.bin_dir
+    settings["bin_cache_max_size"] = self.__args.bin_cache_max_size
+    settings["bin_cache_max_age"] = self.__args.bin_cache_max_age
 
     # create storage dir that will hold node info
-    if not os.path.isdir(os.path.dirname(__file__)+"/storage"):
-      os.mkdir(os.path.dirname(__file__)+"/storage")
-    
-    with open(os.path.dirname(__file__)+"/storage/config.json","w") as json_settings:
-      json.dump(settings,json_settings,indent=4)
+    os.makedirs(self.__storage, exist_ok=True)
+
+    # pick ports no other profile uses, under a lock so parallel runs can't pick the same block
+    with ProfileLock(self.__storage_root):
+      taken = [port_range for other in OtherProfileSettings(self.__storage_root, self.__args.profile).values() for port_range in PortRanges(other)]
+      node_count = self.__args.validators + self.__args.non_validators
+      ports = {kind: getattr(self.__args, kind) for kind in PORT_BASES}
+
+      if all(port is None for port in ports.values()):
+        # keep the block of the last run if it still fits
+        previous = json.load(open(self.__storage+"/config.json")) if os.path.isfile(self.__storage+"/config.json") else {}
+        ports = {kind: previous.get(kind) for kind in PORT_BASES}
+        ranges = [(int(port), int(port)+node_count) for port in ports.values() if port is not None]
+        if len(ranges) != len(PORT_BASES) or Overlaps(ranges, taken) or BusyPorts([port for start, end in ranges for port in range(start, end)]):
+          ports = AllocatePorts(node_count, taken)
+      else:
+        ports = {kind: port if port is not None else PORT_BASES[kind] for kind, port in ports.items()}
+        if Overlaps([(port, port+node_count) for port in ports.values()], taken):
+          sys.exit("The given ports overlap with the ports of another profile!")
+
+      for kind, port in ports.items():
+        setattr(self.__args, kind, int(port))
+        settings[kind] = int(port)
+
+      WriteJsonAtomic(self.__storage+"/config.json", settings)
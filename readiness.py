@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+import asyncio
+import socket
+import struct
+import time
+
+from jsonrpc import JsonRpcClient, JsonRpcError
+
+
+# polygon-sdk --max-peers default
+DEFAULT_MAX_PEERS = 40
+
+
+# check if something accepts connections on host:port
+async def ProbePort(host: str, port: int, timeout: float = 1) -> bool:
+  try:
+    _, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), timeout)
+  except (OSError, asyncio.TimeoutError):
+    return False
+  # reset instead of a clean close, a probe left in TIME_WAIT would keep its ephemeral port from a node binding it
+  writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+  writer.close()
+  return True
+
+# poll a node until all of its ports accept connections
+async def WaitForPorts(node: dict, deadline: float, interval: float) -> bool:
+  while time.monotonic() < deadline:
+    probes = await asyncio.gather(*[ProbePort(node["host"], node[port]) for port in ("grpc_port", "libp2p_port", "json_rpc_port")])
+    if all(probes):
+      return True
+    await asyncio.sleep(interval)
+  return False
+
+# poll a single node with open ports until it is fully peered and its chain moves forward
+# until listening is set, the connection is reset after every round instead of kept alive
+async def WaitForNode(node: dict, expected_peers: int, started_at: float, deadline: float, interval: float, ports: bool = True, listening: asyncio.Event = None) -> dict:
+  status = {"index": node["index"], "ready": False, "time_to_ready": None, "ports": ports, "block": None, "peers": None}
+  if not ports:
+    return status
+  client = JsonRpcClient(node["host"], node["json_rpc_port"])
+  first_block = None
+  try:
+    while time.monotonic() < deadline:
+      try:
+        block, peers = await asyncio.gather(client.Call("eth_blockNumber"), client.Call("net_peerCount"))
+        status["block"] = int(block, 16)
+        status["peers"] = int(peers, 16)
+      except (OSError, asyncio.TimeoutError, JsonRpcError, ValueError, TypeError):
+        pass
+      else:
+        if first_block is None:
+          first_block = status["block"]
+        # sealing means we have seen the chain grow while we were watching
+        if status["block"] > first_block and status["peers"] >= expected_peers:
+          status["ready"] = True
+          status["time_to_ready"] = time.monotonic() - started_at
+          return status
+
+      if listening is not None and not listening.is_set():
+        await client.Close(reset=True)
+      await asyncio.sleep(interval)
+  finally:
+    await client.Close()
+  return status
+
+# poll all nodes concurrently, returns a status per node once every node is ready or the timeout passed
+async def WaitForCluster(nodes: list, timeout: float, started_at: float = None, interval: float = 0.5, max_peers: int = DEFAULT_MAX_PEERS) -> list:
+  started_at = started_at or time.monotonic()
+  deadline = time.monotonic() + timeout
+  # nodes stop dialing at their peer limit, so big clusters never form a full mesh
+  expected_peers = min(len(nodes)-1, max_peers) if max_peers else len(nodes)-1
+  # a keep-alive connection holds an ephemeral port, which can be the port of a node that hasn't bound yet.
+  # so nodes are polled as soon as their own ports are open, but only kept connected once every node is listening
+  listening = asyncio.Event()
+  open_nodes = []
+
+  async def WaitFor(node: dict) -> dict:
+    ports = await WaitForPorts(node, deadline, interval)
+    if ports:
+      open_nodes.append(node)
+      if len(open_nodes) == len(nodes):
+        listening.set()
+    return await WaitForNode(node, expected_peers, started_at, deadline, interval, ports, listening)
+
+  return await asyncio.gather(*[WaitFor(node) for node in nodes])
+
+# print a line per node and return True if the whole cluster is ready
+def ReportReadiness(statuses: list) -> bool:
+  for status in statuses:
+    if status["ready"]:
+      print(f"Node {status['index']}: ready in {status['time_to_ready']:.2f}s (block {status['block']}, {status['peers']} peers)")
+    elif not status["ports"]:
+      print(f"Node {status['index']}: NOT READY, ports not open")
+    else:
+      print(f"Node {status['index']}: NOT READY (block {status['block']}, {status['peers']} peers)")
+  return all(status["ready"] for status in statuses)
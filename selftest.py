@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+import asyncio
+
+from ethtx import Keccak256, Rlp, Address, SignTransaction
+from jsonrpc import ReadResponse
+
+
+# published keccak256 digests, the last input spans two sponge blocks
+KECCAK_VECTORS = [
+  (b"", "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"),
+  (b"abc", "4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45"),
+  (b"The quick brown fox jumps over the lazy dog", "4d741b6f1eb29cb2a9b9911c82f56fa8d73b04959d3d9d222895df6c0b28aa15"),
+  (b"a" * 200, "96ea54061def936c4be90b518992fdc6f12f535068a256229aca54267b4d084d"),
+]
+
+# examples from the ethereum rlp spec
+RLP_VECTORS = [
+  (b"dog", "83646f67"),
+  ([b"cat", b"dog"], "c88363617483646f67"),
+  (b"", "80"),
+  ([], "c0"),
+  (0, "80"),
+  (15, "0f"),
+  (1024, "820400"),
+  ([[], [[]], [[], [[]]]], "c7c0c1c0c3c0c1c0"),
+  (b"Lorem ipsum dolor sit amet, consectetur adipisicing elit", "b8384c6f72656d20697073756d20646f6c6f722073697420616d65742c20636f6e7365637465747572206164697069736963696e6720656c6974"),
+]
+
+# private key -> address
+ADDRESS_VECTORS = [
+  (1, "0x7e5f4552091a69125d5dfcb7b8c2659029395bdf"),
+  (int("46" * 32, 16), "0x9d8a62f656a8d1615c1294fd71e9cfb3e4855a4f"),
+]
+
+# the signed transaction from the EIP-155 example
+EIP155_VECTOR = (
+  (int("46" * 32, 16), 9, 20 * 10**9, 21000, "0x" + "35" * 20, 10**18, 1),
+  "0xf86c098504a817c800825208943535353535353535353535353535353535353535880de0b6b3a76400008025a028ef61340bd939bc2195fe537567866003e1a15d3c71ff63e1590620aa636276a067cbe9d8997f761aecb703304b3800ccf555c9f3dc64214b297fb1966a3b6d83",
+)
+
+# raw HTTP responses -> (status, body, connection header)
+HTTP_VECTORS = [
+  (b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 11\r\n\r\n{\"id\": 1}\r\n", (200, b"{\"id\": 1}\r\n", "")),
+  (b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n4;ext=1\r\n{\"id\r\n5\r\n\": 2}\r\n0\r\n\r\n", (200, b"{\"id\": 2}", "")),
+  (b"HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\n\r\nbusy", (503, b"busy", "close")),
+]
+
+
+def _Check(name: str, got, expected, failures: list) -> None:
+  if got != expected:
+    failures.append(f"{name}: expected {expected!r}, got {got!r}")
+
+async def _ParseResponse(raw: bytes) -> tuple:
+  reader = asyncio.StreamReader()
+  reader.feed_data(raw)
+  reader.feed_eof()
+  return await ReadResponse(reader)
+
+# check the hand written hashing, signing, rlp and http code against known answers, returns the failures
+def KnownAnswerFailures() -> list:
+  failures = []
+  for data, digest in KECCAK_VECTORS:
+    _Check(f"keccak256({data[:16]!r})", Keccak256(data).hex(), digest, failures)
+  for item, encoded in RLP_VECTORS:
+    _Check(f"rlp({str(item)[:16]})", Rlp(item).hex(), encoded, failures)
+  for key, address in ADDRESS_VECTORS:
+    _Check(f"address({hex(key)[:10]}...)", Address(key), address, failures)
+  arguments, raw = EIP155_VECTOR
+  _Check("eip-155 transaction", SignTransaction(*arguments)[0], raw, failures)
+  for response, (status, body, connection) in HTTP_VECTORS:
+    got_status, headers, got_body = asyncio.run(_ParseResponse(response))
+    _Check(f"http response {response[:20]!r}", (got_status, got_body, headers.get("connection", "")), (status, body, connection), failures)
+  return failures
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+import os
+import json
+import time
+import errno
+import fcntl
+import shutil
+import tarfile
+
+from helpers import WriteJsonAtomic
+from profiles import PROFILE_NAME_PATTERN, DEFAULT_PROFILE
+
+
+# ioctl that makes dst share all blocks of src on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+# leveldb never changes table files once written, so they are safe to hardlink
+IMMUTABLE_SUFFIXES = (".ldb", ".sst")
+
+
+class FileCloner:
+  # copies files as cheaply as the filesystem allows: reflink, then hardlink for immutable files, then a real copy
+  def __init__(self) -> None:
+    self.__reflink = True
+    self.counts = {"reflink": 0, "hardlink": 0, "copy": 0}
+
+  def CloneFile(self, src: str, dst: str) -> None:
+    if self.__reflink:
+      try:
+        with open(src, "rb") as source, open(dst, "wb") as target:
+          fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        shutil.copystat(src, dst)
+        self.counts["reflink"] += 1
+        return
+      except OSError as error:
+        if error.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+          raise
+        # not supported here, don't try again for every file
+        self.__reflink = False
+        os.remove(dst)
+
+    if src.endswith(IMMUTABLE_SUFFIXES):
+      try:
+        os.link(src, dst)
+        self.counts["hardlink"] += 1
+        return
+      except OSError as error:
+        if error.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+          raise
+
+    shutil.copy2(src, dst)
+    self.counts["copy"] += 1
+
+  def CloneTree(self, src: str, dst: str) -> None:
+    if os.path.isfile(src):
+      os.makedirs(os.path.dirname(dst), exist_ok=True)
+      self.CloneFile(src, dst)
+      return
+    os.makedirs(dst)
+    for root, dirs, files in os.walk(src):
+      target_root = os.path.join(dst, os.path.relpath(root, src))
+      for name in dirs:
+        os.mkdir(os.path.join(target_root, name))
+      for name in files:
+        self.CloneFile(os.path.join(root, name), os.path.join(target_root, name))
+
+
+def SameFilesystem(path: str, other: str) -> bool:
+  def Device(path: str) -> int:
+    # the path itself may not exist yet
+    while not os.path.exists(path):
+      path = os.path.dirname(path)
+    return os.stat(path).st_dev
+  return Device(path) == Device(other)
+
+def RemovePath(path: str) -> None:
+  if os.path.isdir(path) and not os.path.islink(path):
+    shutil.rmtree(path)
+  elif os.path.lexists(path):
+    os.remove(path)
+
+
+class Snapshots:
+  # named cluster snapshots, cloned file by file when on the same filesystem as the data, a tar.gz otherwise
+  def __init__(self, snapshot_dir: str) -> None:
+    self.__snapshot_dir = snapshot_dir
+
+  def Exists(self, name: str) -> bool:
+    return os.path.isfile(os.path.join(self.__Path(name), "manifest.json"))
+
+  def List(self) -> list:
+    snapshots = []
+    if os.path.isdir(self.__snapshot_dir):
+      for name in sorted(os.listdir(self.__snapshot_dir)):
+        # anything we didn't create, like links to elsewhere, is not a snapshot
+        if PROFILE_NAME_PATTERN.match(name) and not os.path.islink(os.path.join(self.__snapshot_dir, name)) and self.Exists(name):
+          with open(os.path.join(self.__snapshot_dir, name, "manifest.json")) as manifest_file:
+            snapshots.append(json.load(manifest_file))
+    return snapshots
+
+  # capture sources of profile, a dict of snapshot relative name -> absolute file or dir path
+  def Take(self, name: str, sources: dict, profile: str = DEFAULT_PROFILE) -> dict:
+    path = self.__Path(name)
+    build_path = f"{path}.tmp-{os.getpid()}"
+    RemovePath(build_path)
+    os.makedirs(build_path)
+
+    sources = {relative: source for relative, source in sources.items() if os.path.exists(source)}
+    started = time.monotonic()
+    if all(SameFilesystem(source, build_path) for source in sources.values()):
+      method = "clone"
+      cloner = FileCloner()
+      for relative, source in sources.items():
+        cloner.CloneTree(source, os.path.join(build_path, "files", relative))
+      counts = cloner.counts
+    else:
+      method = "archive"
+      with tarfile.open(os.path.join(build_path, "archive.tar.gz"), "w:gz", compresslevel=1) as archive:
+        for relative, source in sources.items():
+          archive.add(source, arcname=relative)
+      counts = {}
+
+    manifest = {"name": name, "profile": profile, "created": time.time(), "method": method, "files": counts, "targets": sources, "duration": time.monotonic() - started}
+    WriteJsonAtomic(os.path.join(build_path, "manifest.json"), manifest)
+    # swap the finished snapshot into place
+    RemovePath(path)
+    os.replace(build_path, path)
+    return manifest
+
+  # put every captured path back where it was taken from, only into the profile it was taken from
+  def Restore(self, name: str, profile: str = DEFAULT_PROFILE) -> dict:
+    path = self.__Path(name)
+    with open(os.path.join(path, "manifest.json")) as manifest_file:
+      manifest = json.load(manifest_file)
+    # the targets are the other profile's paths, which may be in use by its nodes right now.
+    # snapshots from before profiles were all taken from the default one
+    source_profile = manifest.get("profile", DEFAULT_PROFILE)
+    if source_profile != profile:
+      raise ValueError(f"Snapshot {name} was taken from profile {source_profile}, restore it with -P {source_profile}")
+    targets = manifest["targets"]
+    started = time.monotonic()
+
+    # restore next to the targets first, so a failed restore leaves the current state alone
+    staged = {relative: f"{target}.restore-{os.getpid()}" for relative, target in targets.items()}
+    for staging in staged.values():
+      RemovePath(staging)
+      os.makedirs(os.path.dirname(staging), exist_ok=True)
+
+    counts = {}
+    if manifest["method"] == "clone":
+      cloner = FileCloner()
+      for relative, staging in staged.items():
+        cloner.CloneTree(os.path.join(path, "files", relative), staging)
+      counts = cloner.counts
+    else:
+      with tarfile.open(os.path.join(path, "archive.tar.gz"), "r|gz") as archive:
+        # names like storage/config.json contain slashes, so match the longest one first
+        names = sorted(staged, key=len, reverse=True)
+        for member in archive:
+          relative = next((name for name in names if member.name == name or member.name.startswith(name + "/")), None)
+          rest = member.name[len(relative)+1:] if relative else ""
+          if relative is None or ".." in rest.split("/"):
+            continue
+          target = os.path.join(staged[relative], rest) if rest else staged[relative]
+          if member.isdir():
+            os.makedirs(target, exist_ok=True)
+          elif member.isfile():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with archive.extractfile(member) as source, open(target, "wb") as destination:
+              shutil.copyfileobj(source, destination)
+            os.chmod(target, member.mode)
+
+    for relative, target in targets.items():
+      RemovePath(target)
+      os.replace(staged[relative], target)
+
+    return {"method": manifest["method"], "files": counts, "duration": time.monotonic() - started}
+
+  # folder of a snapshot, names that could point anywhere else are refused since Take removes what is there
+  def __Path(self, name: str) -> str:
+    if not PROFILE_NAME_PATTERN.match(name):
+      raise ValueError(f"Invalid snapshot name {name!r}, use letters, digits, '_', '.' and '-'")
+    path = os.path.join(self.__snapshot_dir, name)
+    if os.path.dirname(os.path.realpath(path)) != os.path.realpath(self.__snapshot_dir):
+      raise ValueError(f"Snapshot {name} points outside of {self.__snapshot_dir}, refusing to touch it")
+    return path
@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+import os
+import json
+import time
+import signal
+import socket
+import subprocess
+
+from helpers import WriteJsonAtomic
+from log_collector import LogCollector
+
+
+# restart delays for crashed nodes double from min to max, and reset once a node stays up for STABLE_AFTER seconds
+RESTART_BACKOFF_MIN = 1
+RESTART_BACKOFF_MAX = 60
+STABLE_AFTER = 60
+
+
+# send SIGTERM to all process groups at once, wait up to timeout for them to exit and SIGKILL the rest
+def StopProcessGroups(pgids: list, timeout: float, is_alive=None, wait=time.sleep) -> tuple:
+  def GroupAlive(pgid: int) -> bool:
+    try:
+      os.killpg(pgid, 0)
+      return True
+    except (ProcessLookupError, PermissionError):
+      return False
+  is_alive = is_alive or GroupAlive
+
+  alive = []
+  for pgid in pgids:
+    try:
+      os.killpg(pgid, signal.SIGTERM)
+      alive.append(pgid)
+    except ProcessLookupError:
+      pass
+
+  deadline = time.monotonic() + timeout
+  while alive and time.monotonic() < deadline:
+    wait(0.05)
+    alive = [pgid for pgid in alive if is_alive(pgid)]
+
+  for pgid in alive:
+    try:
+      os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+      pass
+  return len(pgids) - len(alive), len(alive)
+
+# send a command to the supervisor listening on socket_path, returns None if it isn't running
+def SendCommand(socket_path: str, command: dict, timeout: float = 5):
+  if not os.path.exists(socket_path):
+    return None
+  client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  client.settimeout(timeout)
+  try:
+    client.connect(socket_path)
+    client.sendall(json.dumps(command).encode("utf-8") + b"\n")
+    response = b""
+    while not response.endswith(b"\n"):
+      chunk = client.recv(65536)
+      if not chunk:
+        break
+      response += chunk
+    return json.loads(response)
+  except (ConnectionRefusedError, FileNotFoundError):
+    # left behind by a supervisor that died
+    os.remove(socket_path)
+    return None
+  finally:
+    client.close()
+
+
+class Node:
+  # a supervised polygon-sdk server process
+  def __init__(self, index: int, validator: bool, args: list, cpus: set) -> None:
+    self.index = index
+    self.validator = validator
+    self.args = args
+    self.cpus = cpus
+    self.process = None
+    self.started_at = None
+    self.restarts = 0
+    self.backoff = RESTART_BACKOFF_MIN
+    self.restart_at = None
+
+  def Start(self, collector: LogCollector) -> None:
+    def Setup() -> None:
+      os.setsid()
+      if self.cpus:
+        os.sched_setaffinity(0, self.cpus)
+    self.process = subprocess.Popen(self.args, preexec_fn=Setup, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    self.started_at = time.monotonic()
+    self.restart_at = None
+    collector.Add(self.index, self.process.stdout)
+
+  def Alive(self) -> bool:
+    return self.process is not None and self.process.poll() is None
+
+  def ToDict(self) -> dict:
+    return {
+      "index": self.index,
+      "validator": self.validator,
+      "pid": self.process.pid if self.process else None,
+      "state": "running" if self.Alive() else ("restarting" if self.restart_at else ("pending" if self.process is None else "exited")),
+      "restarts": self.restarts,
+      "uptime": time.monotonic() - self.started_at if self.Alive() else None,
+      "cpus": sorted(self.cpus) if self.cpus else None,
+    }
+
+
+class Supervisor:
+  # owns the node processes: staggered start, crash restarts, parallel stop, controlled over a unix socket
+  def __init__(self, nodes: list, storage_dir: str, collector: LogCollector, wave_size: int, wave_delay: float, stop_timeout: float) -> None:
+    self.__nodes = nodes
+    self.__storage_dir = storage_dir
+    self.__socket_path = os.path.join(storage_dir, "supervisor.sock")
+    self.__collector = collector
+    self.__wave_size = wave_size or len(nodes)
+    self.__wave_delay = wave_delay
+    self.__stop_timeout = stop_timeout
+    self.__running = True
+
+  def Run(self) -> None:
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(self.__socket_path):
+      os.remove(self.__socket_path)
+    server.bind(self.__socket_path)
+    server.listen()
+    self.__collector.Watch(server, lambda: self.__Accept(server))
+    signal.signal(signal.SIGTERM, lambda *_: self.__Stop())
+
+    try:
+      next_wave_at = time.monotonic()
+      pending = list(self.__nodes)
+      while self.__running:
+        # start the next wave of nodes
+        if pending and time.monotonic() >= next_wave_at:
+          wave, pending = pending[:self.__wave_size], pending[self.__wave_size:]
+          for node in wave:
+            node.Start(self.__collector)
+            # big waves take a while to spawn, keep answering the socket and draining pipes meanwhile
+            self.__collector.Poll(0)
+          self.__WritePids()
+          next_wave_at = time.monotonic() + self.__wave_delay
+
+        self.__collector.Poll(0.2)
+        self.__RestartCrashed()
+    finally:
+      self.__collector.Close()
+      server.close()
+      if os.path.exists(self.__socket_path):
+        os.remove(self.__socket_path)
+
+  def __RestartCrashed(self) -> None:
+    if not self.__running:
+      return
+    now = time.monotonic()
+    restarted = False
+    for node in self.__nodes:
+      if node.process is None or node.Alive():
+        continue
+      if node.restart_at is None:
+        # a node that ran for a while gets a fresh backoff
+        if now - node.started_at >= STABLE_AFTER:
+          node.backoff = RESTART_BACKOFF_MIN
+        node.restart_at = now + node.backoff
+        print(f"Node {node.index} exited with code {node.process.returncode}, restarting in {node.backoff}s", flush=True)
+        node.backoff = min(node.backoff * 2, RESTART_BACKOFF_MAX)
+      elif now >= node.restart_at:
+        node.restarts += 1
+        node.Start(self.__collector)
+        restarted = True
+    if restarted:
+      self.__WritePids()
+
+  # stop every node in parallel and end the supervisor loop, timeout overrides the one given at start
+  def __Stop(self, timeout: float = None) -> dict:
+    if not self.__running:
+      return {"error": "already stopping"}
+    self.__running = False
+    processes = {node.process.pid: node.process for node in self.__nodes if node.Alive()}
+    # keep draining the pipes while waiting, nodes blocked on a full pipe never exit
+    timeout = self.__stop_timeout if timeout is None else timeout
+    terminated, killed = StopProcessGroups(list(processes), timeout, lambda pid: processes[pid].poll() is None, self.__collector.Poll)
+    for process in processes.values():
+      process.wait()
+    for name in ("validator-pids.json", "non_validator-pids.json"):
+      if os.path.isfile(os.path.join(self.__storage_dir, name)):
+        os.remove(os.path.join(self.__storage_dir, name))
+    return {"terminated": terminated, "killed": killed}
+
+  def __Accept(self, server: socket.socket) -> None:
+    connection, _ = server.accept()
+    with connection:
+      connection.settimeout(5)
+      try:
+        request = b""
+        while not request.endswith(b"\n"):
+          chunk = connection.recv(65536)
+          if not chunk:
+            return
+          request += chunk
+        request = json.loads(request)
+        command = request.get("command")
+        if command == "stop":
+          response = self.__Stop(float(request["timeout"]) if request.get("timeout") is not None else None)
+        elif command == "status":
+          response = {"nodes": [node.ToDict() for node in self.__nodes]}
+        else:
+          response = {"error": f"unknown command {command}"}
+        connection.sendall(json.dumps(response).encode("utf-8") + b"\n")
+      except (OSError, ValueError) as error:
+        print(f"Bad supervisor request: {error}", flush=True)
+
+  # keep the pid files up to date for tools that look at them
+  def __WritePids(self) -> None:
+    for name, validator in (("validator-pids.json", True), ("non_validator-pids.json", False)):
+      pids = [node.process.pid for node in self.__nodes if node.validator == validator and node.process]
+      WriteJsonAtomic(os.path.join(self.__storage_dir, name), pids)
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+import os
+import time
+import resource
+import threading
+import contextlib
+
+from helpers import WriteJsonAtomic
+
+
+# cpu seconds used by this process and by the children it already waited for (go build, secrets init)
+def CpuTimes() -> tuple:
+  children = resource.getrusage(resource.RUSAGE_CHILDREN)
+  return time.process_time(), children.ru_utime + children.ru_stime
+
+
+class BringUpTimer:
+  # wall and cpu time of every bring-up phase plus per node spans, reported as chrome trace events
+  def __init__(self, name: str) -> None:
+    self.__name = name
+    self.__origin = time.monotonic()
+    self.__started = time.time()
+    self.__phases = []
+    self.__spans = []
+    self.__lock = threading.Lock()
+
+  # time the block as a phase, nested phases show up inside their parent
+  @contextlib.contextmanager
+  def Phase(self, name: str):
+    started = time.monotonic()
+    cpu_self, cpu_children = CpuTimes()
+    try:
+      yield
+    finally:
+      ended = time.monotonic()
+      now_self, now_children = CpuTimes()
+      self.__phases.append({
+        "name": name,
+        "start": started - self.__origin,
+        "wall": ended - started,
+        "cpu": (now_self - cpu_self) + (now_children - cpu_children),
+        "cpu_self": now_self - cpu_self,
+        "cpu_children": now_children - cpu_children,
+      })
+
+  # record work done for a single node, started and ended are time.monotonic() values
+  def Span(self, category: str, index: int, started: float, ended: float, **args) -> None:
+    with self.__lock:
+      self.__spans.append({"category": category, "index": index, "start": started - self.__origin, "wall": ended - started, "args": args})
+
+  def Report(self) -> dict:
+    phases = sorted(self.__phases, key=lambda phase: phase["start"])
+    spans = sorted(self.__spans, key=lambda span: (span["category"], span["index"]))
+
+    # trace viewers (chrome://tracing, perfetto) want microseconds, phases on thread 0 and a thread per node
+    events = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": self.__name}},
+              {"name": "thread_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": "phases"}}]
+    for index in sorted({span["index"] for span in spans}):
+      events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": index, "args": {"name": f"node-{index}"}})
+    for phase in phases:
+      events.append({"name": phase["name"], "cat": "phase", "ph": "X", "pid": 1, "tid": 0, "ts": round(phase["start"]*1e6), "dur": round(phase["wall"]*1e6),
+                     "args": {"cpu": phase["cpu"], "cpu_self": phase["cpu_self"], "cpu_children": phase["cpu_children"]}})
+    for span in spans:
+      events.append({"name": span["category"], "cat": "node", "ph": "X", "pid": 1, "tid": span["index"], "ts": round(span["start"]*1e6), "dur": round(span["wall"]*1e6), "args": span["args"]})
+
+    nodes = {}
+    for span in spans:
+      nodes.setdefault(str(span["index"]), {})[span["category"]] = dict(span["args"], start=span["start"], wall=span["wall"])
+
+    return {
+      "traceEvents": events,
+      "displayTimeUnit": "ms",
+      "otherData": {
+        "name": self.__name,
+        "started": self.__started,
+        "wall": time.monotonic() - self.__origin,
+        "phases": phases,
+        "nodes": nodes,
+      },
+    }
+
+  def Write(self, path: str) -> dict:
+    report = self.Report()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    WriteJsonAtomic(path, report, indent=None)
+    return report
+
+# one line per top level phase, nested phases indented under it
+def PrintPhases(report: dict) -> None:
+  phases = report["otherData"]["phases"]
+  print(f"{'phase':<24} {'wall':>9} {'cpu':>9}")
+  open_phases = []
+  for phase in phases:
+    while open_phases and phase["start"] >= open_phases[-1]["start"] + open_phases[-1]["wall"]:
+      open_phases.pop()
+    name = "  " * len(open_phases) + phase["name"]
+    print(f"{name:<24} {phase['wall']:>8.3f}s {phase['cpu']:>8.3f}s")
+    open_phases.append(phase)
+  print(f"{'total':<24} {report['otherData']['wall']:>8.3f}s")